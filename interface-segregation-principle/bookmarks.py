@@ -0,0 +1,147 @@
+# bookmarks.py
+# !/usr/bin/env python3
+"""Persistent bookmarks with nearest-bookmark and range queries.
+
+BookmarkStore keeps the bookmarked pages in a sorted array, so the next or
+previous bookmark from a page, and the bookmarks in a range of pages, are
+found by bisection in O(log n) instead of by sorting a set.
+
+Every change is appended to a small log file next to the e-book, one
+fixed-size record per change, so adding a bookmark never rewrites the file.
+The log is read the first time the bookmarks are needed, and rewritten
+without its superseded records when it has grown to several times the
+number of bookmarks.
+"""
+
+
+import bisect
+import os
+import struct
+from array import array
+from typing import BinaryIO, Final, Iterator, Optional
+
+BOOKMARKS_SUFFIX: Final[str] = ".bookmarks"
+
+# An operation (_ADD or _REMOVE) and a page
+_RECORD: Final[struct.Struct] = struct.Struct("<Bq")
+_ADD: Final[int] = 1
+_REMOVE: Final[int] = 0
+# The log is compacted once it holds this many times more records than
+# there are bookmarks (plus _COMPACT_SLACK)
+_COMPACT_RATIO: Final[int] = 4
+_COMPACT_SLACK: Final[int] = 256
+
+
+class BookmarkStore:
+    """The bookmarked pages of an e-book, persisted to a log file."""
+
+    def __init__(self, path: str) -> None:
+        """Inits BookmarkStore with its log file, without reading it.
+
+        Args:
+            path: The pathname of the log file.
+        """
+        self.path = path
+        self._pages: Optional[array] = None
+        self._log: Optional[BinaryIO] = None
+
+    def _loaded(self) -> array:
+        """Returns the sorted pages, reading the log on first use."""
+        if self._pages is None:
+            pages = set()
+            records = 0
+            try:
+                with open(self.path, "rb") as file:
+                    data = file.read()
+            except FileNotFoundError:
+                data = b""
+            usable = len(data) - len(data) % _RECORD.size
+            if usable < len(data):
+                # Drops a torn final record (from a crash mid-write), so
+                # records appended later stay aligned
+                os.truncate(self.path, usable)
+            for operation, page in _RECORD.iter_unpack(data[:usable]):
+                if operation == _ADD:
+                    pages.add(page)
+                else:
+                    pages.discard(page)
+                records += 1
+            self._pages = array("q", sorted(pages))
+            if records > _COMPACT_RATIO * len(pages) + _COMPACT_SLACK:
+                self._compact()
+        return self._pages
+
+    def _compact(self) -> None:
+        """Rewrites the log with one record per bookmark, atomically."""
+        assert self._pages is not None
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(
+                b"".join(_RECORD.pack(_ADD, page) for page in self._pages)
+            )
+        os.replace(temporary, self.path)
+
+    def _append(self, operation: int, page: int) -> None:
+        if self._log is None:
+            self._log = open(self.path, "ab")
+        self._log.write(_RECORD.pack(operation, page))
+        self._log.flush()
+
+    def add(self, page: int) -> None:
+        """Bookmarks a page."""
+        pages = self._loaded()
+        index = bisect.bisect_left(pages, page)
+        if index < len(pages) and pages[index] == page:
+            return
+        pages.insert(index, page)
+        self._append(_ADD, page)
+
+    def remove(self, page: int) -> None:
+        """Removes the bookmark of a page.
+
+        Raises:
+            KeyError: If the page is not bookmarked.
+        """
+        pages = self._loaded()
+        index = bisect.bisect_left(pages, page)
+        if index == len(pages) or pages[index] != page:
+            raise KeyError(page)
+        del pages[index]
+        self._append(_REMOVE, page)
+
+    def __contains__(self, page: object) -> bool:
+        if not isinstance(page, int):
+            return False
+        pages = self._loaded()
+        index = bisect.bisect_left(pages, page)
+        return index < len(pages) and pages[index] == page
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._loaded())
+
+    def __len__(self) -> int:
+        return len(self._loaded())
+
+    def next_after(self, page: int) -> Optional[int]:
+        """Returns the first bookmark after page, or None."""
+        pages = self._loaded()
+        index = bisect.bisect_right(pages, page)
+        return pages[index] if index < len(pages) else None
+
+    def previous_before(self, page: int) -> Optional[int]:
+        """Returns the last bookmark before page, or None."""
+        pages = self._loaded()
+        index = bisect.bisect_left(pages, page)
+        return pages[index - 1] if index else None
+
+    def between(self, from_page: int, to_page: int) -> list[int]:
+        """Returns the bookmarks from from_page to to_page (inclusive)."""
+        pages = self._loaded()
+        start = bisect.bisect_left(pages, from_page)
+        end = bisect.bisect_right(pages, to_page)
+        return pages[start:end].tolist()
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,161 @@
+# capabilities.py
+# !/usr/bin/env python3
+"""Cached capability checks for runtime protocols.
+
+isinstance() with a @runtime_checkable protocol looks up every member of the
+protocol on the object, on every call. supports() answers the same question
+from a per-class bitset instead: each registered protocol (a capability)
+gets one bit, and the bits of a class are computed once, the first time an
+instance of it is checked. After that a check costs two lookups and an
+AND, however many members the protocol has.
+
+Capabilities are a property of the class: a class supports a protocol if
+it has every member of it, dunder methods included, that isinstance()
+checks. Members set on instances only are not seen, as capabilities here
+are methods.
+
+The cached bits of a class are stale once the class itself is changed.
+invalidate() drops them explicitly; classes created with CapabilityMeta as
+their metaclass drop them by themselves whenever an attribute is set or
+deleted.
+"""
+
+
+import typing
+import weakref
+from typing import Dict, Optional, Set
+
+_bits: Dict[type, int] = {}  # Capability -> its bit
+_members: Dict[type, Set[str]] = {}  # Capability -> its member names
+# Class -> the bits of its capabilities. Weak, so classes created at run
+# time are freed once nothing else refers to them.
+_masks: "weakref.WeakKeyDictionary[type, int]" = weakref.WeakKeyDictionary()
+
+
+def _protocol_members(protocol: type) -> Set[str]:
+    """Returns the names of the members of a protocol and its bases, the
+    same names isinstance() checks."""
+    # Python 3.12+ computes the members once, when the protocol is created
+    members = getattr(protocol, "__protocol_attrs__", None)
+    if members is None:
+        # Before 3.12, isinstance() finds them on every check with this
+        # private helper of typing, so it is called here too to check the
+        # very same members. 3.12+ reads __protocol_attrs__ above instead.
+        members = typing._get_protocol_attrs(protocol)  # type: ignore
+    return set(members)
+
+
+def register(capability: type) -> int:
+    """Registers a protocol as a capability and returns its bit.
+
+    Registering a protocol again returns the bit it already has.
+    """
+    bit = _bits.get(capability)
+    if bit is None:
+        bit = _bits[capability] = 1 << len(_bits)
+        _members[capability] = _protocol_members(capability)
+        _masks.clear()  # Computed without this capability
+    return bit
+
+
+def capability_mask(cls: type) -> int:
+    """Returns the bits of the capabilities of a class, computing them on
+    first use."""
+    mask = _masks.get(cls)
+    if mask is None:
+        mask = 0
+        for capability, members in _members.items():
+            if all(getattr(cls, name, None) is not None for name in members):
+                mask |= _bits[capability]
+        _masks[cls] = mask
+    return mask
+
+
+def supports(obj: object, capability: type) -> bool:
+    """Returns whether an object supports a capability (a protocol).
+
+    The equivalent of isinstance(obj, capability) for a runtime protocol,
+    answered from the cached bits of the object's class.
+    """
+    mask = _masks.get(type(obj))
+    if mask is None:
+        mask = capability_mask(type(obj))
+    bit = _bits.get(capability)
+    if bit is None:
+        bit = register(capability)
+        mask = capability_mask(type(obj))
+    return bool(mask & bit)
+
+
+def invalidate(cls: Optional[type] = None) -> None:
+    """Drops the cached bits of a class and its subclasses.
+
+    Args:
+        cls: The class that changed, or None to drop the bits of every
+        class.
+    """
+    if cls is None:
+        _masks.clear()
+        return
+    for cached in [cached for cached in _masks if issubclass(cached, cls)]:
+        del _masks[cached]
+
+
+class CapabilityMeta(type):
+    """A metaclass whose classes invalidate their cached capabilities
+    when they change."""
+
+    def __setattr__(cls, name: str, value: object) -> None:
+        super().__setattr__(name, value)
+        invalidate(cls)
+
+    def __delattr__(cls, name: str) -> None:
+        super().__delattr__(name)
+        invalidate(cls)
+
+
+if __name__ == "__main__":
+    from typing import Protocol, runtime_checkable
+
+    @runtime_checkable
+    class SupportsLen(Protocol):
+        def __len__(self) -> int: ...
+
+    @runtime_checkable
+    class SupportsPrivateRender(Protocol):
+        def _render(self) -> str: ...
+
+    class Page:
+        def __len__(self) -> int:
+            return 1
+
+        def _render(self) -> str:
+            return ""
+
+    protocols = (
+        SupportsLen,
+        SupportsPrivateRender,
+        typing.SupportsAbs,
+        typing.SupportsBytes,
+        typing.SupportsComplex,
+        typing.SupportsFloat,
+        typing.SupportsIndex,
+        typing.SupportsInt,
+        typing.SupportsRound,
+    )
+    objects = (object(), "x", b"x", 1, 1.5, 1j, [], {}, Page())
+    for protocol in protocols:
+        for obj in objects:
+            assert supports(obj, protocol) == isinstance(obj, protocol), (
+                obj,
+                protocol,
+            )
+
+    import gc
+
+    transient = type("Transient", (Page,), {})
+    assert supports(transient(), SupportsLen)
+    reference = weakref.ref(transient)
+    del transient
+    gc.collect()
+    assert reference() is None  # Not kept alive by the cache
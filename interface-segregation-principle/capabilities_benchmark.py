@@ -0,0 +1,48 @@
+# capabilities_benchmark.py
+# !/usr/bin/env python3
+"""Benchmarks supports() against isinstance() with runtime protocols.
+
+Each check is timed on a reader that has the capability and on one that
+does not, since isinstance() returns early on a missing member.
+
+Usage: python capabilities_benchmark.py [checks]
+"""
+
+
+import sys
+import timeit
+from typing import Final
+
+from capabilities import supports
+from isp_solution_1 import (
+    ComicBookReader,
+    Display,
+    KindleReader,
+    SupportsPlayVideo,
+    SupportsPrint,
+)
+
+CHECKS: Final[int] = 1_000_000
+
+
+if __name__ == "__main__":
+    checks = int(sys.argv[1]) if len(sys.argv) > 1 else CHECKS
+    comicbook_reader = ComicBookReader(Display(6.8, 300), storage_size=8)
+    kindle_reader = KindleReader(Display(6, 167), storage_size=4)
+    cases = {
+        "has capability": (kindle_reader, SupportsPrint),
+        "lacks capability": (comicbook_reader, SupportsPlayVideo),
+    }
+    print(f"{checks:,} checks")
+    print(f"{'case':<18} {'isinstance':>12} {'supports':>12} {'speedup':>8}")
+    for name, (reader, protocol) in cases.items():
+        assert isinstance(reader, protocol) == supports(reader, protocol)
+        times = [
+            timeit.timeit(lambda: check(reader, protocol), number=checks)
+            for check in (isinstance, supports)
+        ]
+        per_check = [time / checks * 1e9 for time in times]
+        print(
+            f"{name:<18} {per_check[0]:>10.0f}ns {per_check[1]:>10.0f}ns "
+            f"{times[0] / times[1]:>7.1f}x"
+        )
@@ -13,8 +13,21 @@ decorator ... essentially making them 'runtime protocols'"
 """
 
 
-from collections import OrderedDict, namedtuple
-from typing import Protocol, runtime_checkable
+import os
+import sys
+from collections import namedtuple
+from typing import BinaryIO, Optional, Protocol, runtime_checkable
+
+from bookmarks import BOOKMARKS_SUFFIX, BookmarkStore
+from capabilities import CapabilityMeta, supports
+from library import Library
+from media_stream import MediaStream, media_path
+from page_store import BookPages, PageCache, PageStore, cache_budget
+from prefetch import Prefetcher
+from print_pipeline import print_pages
+from render_cache import RenderCache, shared_render_cache
+from rendering import columns, render_page
+from search_index import SearchIndex, load_or_build
 
 Display = namedtuple("Display", ["size", "ppi"])
 
@@ -49,48 +62,222 @@ class SupportsPlayVideo(Protocol):
         ...
 
 
-class EBookReader:
+# CapabilityMeta keeps the capabilities that supports() caches per class
+# up to date if a reader class is changed at runtime.
+class EBookReader(metaclass=CapabilityMeta):
     """An e-reader device."""
 
-    def __init__(self, screen_size: Display, storage_size: int) -> None:
-        """Inits EBookReader with a display and storage size."""
+    def __init__(
+        self,
+        screen_size: Display,
+        storage_size: int,
+        library: Optional[Library] = None,
+    ) -> None:
+        """Inits EBookReader with a display and storage size.
+
+        A reader in a library shares the library's caches, and budget, with
+        the other readers in it.
+        """
         self._screen_size: Display = screen_size
         self._storage_size: int = storage_size
         self._zoom_level: int = 100
-        self._pages: OrderedDict[int, object] = OrderedDict()
+        self._page_cache: PageCache
+        self._renders: RenderCache
+        if library is None:
+            self._page_cache = PageCache(cache_budget(storage_size))
+            self._renders = shared_render_cache(
+                screen_size, cache_budget(storage_size)
+            )
+        else:
+            self._page_cache = library.pages
+            self._renders = library.renders
+        self._pages: Optional[BookPages] = None
+        self._store: Optional[PageStore] = None
+        self._prefetcher: Optional[Prefetcher] = None
+        self._prefetching: bool = False  # Whether the reader has moved
+        self._search_index: Optional[SearchIndex] = None
         self._current_page: int = 0
-        self._bookmarks: set[int] = set()
+        self._bookmarks: Optional[BookmarkStore] = None
 
     def open(self, path_to_ebook: str) -> None:
         """Open e-book for viewing.
 
+        The e-book is memory-mapped rather than read, and its pages are
+        decoded as they are displayed. Prefetching starts with the first
+        page displayed or turned to, so opening a book puts nothing in the
+        page cache.
+
         Args:
             path_to_ebook: A path-like object which is the pathname of the
             e-book to be opened.
         """
         print(f"Opening e-book from {path_to_ebook}")
+        self.close()
+        self._store = PageStore(path_to_ebook)
+        self._pages = BookPages(
+            self._page_cache, (path_to_ebook, self._store.stat.st_mtime_ns)
+        )
+        self._prefetcher = Prefetcher(self._store.page, self._pages)
+        self._bookmarks = BookmarkStore(path_to_ebook + BOOKMARKS_SUFFIX)
+        self._current_page = 0
+        self._prefetching = False
+
+    def close(self) -> None:
+        """Close the open e-book, if any."""
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        if self._bookmarks is not None:
+            self._bookmarks.close()
+            self._bookmarks = None
+        if self._pages is not None:
+            self._pages.clear()
+            self._pages = None
+        self._search_index = None
+
+    def _open_store(self) -> PageStore:
+        """Returns the pages of the open e-book.
+
+        Raises:
+            RuntimeError: If no e-book is open.
+        """
+        if self._store is None:
+            raise RuntimeError("No e-book is open.")
+        return self._store
+
+    def _columns(self) -> int:
+        """Returns the number of columns pages are rendered to."""
+        return columns(
+            self._screen_size.size, self._screen_size.ppi, self._zoom_level
+        )
+
+    def _page(self, number: int) -> str:
+        """Returns a page, from the page cache when possible."""
+        if self._prefetcher is not None:
+            self._prefetcher.wait(number)
+        store = self._open_store()
+        assert self._pages is not None
+        page = self._pages.get(number)
+        if page is None:
+            page = store.page(number)
+            self._pages.put(number, page)
+        return page
+
+    def _render(self, number: int) -> bytes:
+        """Returns a page rendered for the display at the zoom level.
+
+        Renders are cached, and shared with the readers that have the same
+        display.
+        """
+        store = self._open_store()
+        key = (
+            store.path,
+            store.stat.st_mtime_ns,
+            number,
+            self._zoom_level,
+            self._screen_size.size,
+            self._screen_size.ppi,
+        )
+        return self._renders.render(
+            key, lambda: render_page(self._page(number), self._columns())
+        )
 
     def display_page(self) -> None:
         """Displays the current page to the screen."""
-        self._pages[self._current_page]
+        if self._prefetcher is not None and not self._prefetching:
+            self._prefetching = True
+            self._prefetcher.moved(self._current_page, 0)
+        self._render(self._current_page)
+
+    def set_zoom_level(self, zoom_level: int) -> None:
+        """Set the zoom level.
+
+        Args:
+            zoom_level: The zoom level, in percent.
+        """
+        self._zoom_level = zoom_level
 
     def previous_page(self) -> None:
         """Go to the previous page.
 
         This action is relative to the current page.
         """
-        self._current_page -= 1
+        self._go_to(self._current_page - 1)
 
     def next_page(self) -> None:
         """Go to the next page.
 
         This action is relative to the current page.
         """
-        self._current_page += 1
+        self._go_to(self._current_page + 1)
+
+    def go_to_page(self, page: int) -> None:
+        """Go to a page.
+
+        Args:
+            page: The page to go to.
+        """
+        self._go_to(page)
+
+    def _go_to(self, page: int) -> None:
+        """Moves to page and prefetches the pages likely to follow it."""
+        step = page - self._current_page
+        self._current_page = page
+        if self._prefetcher is not None:
+            self._prefetching = True
+            self._prefetcher.moved(page, step)
+
+    def search(self, query: str) -> list[int]:
+        """Search the e-book.
+
+        The search index is loaded, or built and saved, on the first
+        search.
+
+        Args:
+            query: Terms that must all appear on a page. A term ending in
+            "*" matches any term it starts, and terms in double quotes
+            must appear as a phrase.
+
+        Returns:
+            The matching pages, in order.
+        """
+        if self._search_index is None:
+            store = self._open_store()
+            self._search_index = load_or_build(
+                store.path,
+                (store.page(number) for number in range(len(store))),
+                store.stat,
+            )
+        return self._search_index.search(query)
+
+    def _open_bookmarks(self) -> BookmarkStore:
+        """Returns the bookmarks of the open e-book.
+
+        Raises:
+            RuntimeError: If no e-book is open.
+        """
+        if self._bookmarks is None:
+            raise RuntimeError("No e-book is open.")
+        return self._bookmarks
 
     def add_bookmark(self) -> None:
         """Add a bookmark to the current page."""
-        self._bookmarks.add(self._current_page)
+        self._open_bookmarks().add(self._current_page)
+
+    def next_bookmark(self) -> None:
+        """Go to the first bookmark after the current page, if any."""
+        page = self._open_bookmarks().next_after(self._current_page)
+        if page is not None:
+            self._go_to(page)
+
+    def previous_bookmark(self) -> None:
+        """Go to the last bookmark before the current page, if any."""
+        page = self._open_bookmarks().previous_before(self._current_page)
+        if page is not None:
+            self._go_to(page)
 
 
 # ComicBookReader now opts into the features that is can provide.
@@ -99,51 +286,148 @@ class EBookReader:
 class ComicBookReader(EBookReader):
     """An e-reader device that is capable of reading comic books."""
 
-    def print(self, from_page: int, to_page: int) -> None:
+    def print(
+        self,
+        from_page: int,
+        to_page: int,
+        printer: Optional[BinaryIO] = None,
+    ) -> None:
         """Print one or more pages from the e-book.
 
         Args:
             from_page: The page to start printing from (inclusive).
             to_page: The last page that should be printed (inclusive).
+            printer: The stream rendered pages are sent to, standard
+            output when omitted.
         """
         print(f"Printing {from_page} to {to_page}")
+        print_pages(
+            self._open_store(),
+            from_page,
+            to_page,
+            self._columns(),
+            printer or sys.stdout.buffer,
+        )
 
 
 class KindleReader(EBookReader):
     """An e-reader device that is capable of reading Kindle books."""
 
-    def play_sound(self) -> None:
-        """Play the sound on the current page."""
+    def play_sound(self, output: Optional[BinaryIO] = None) -> None:
+        """Play the sound on the current page.
+
+        Args:
+            output: The stream the sound is played to, discarded when
+            omitted.
+        """
         print("Playing sound")
+        self._play("sound", output)
 
-    def play_video(self) -> None:
-        """Play the video on the current page."""
-        print("Playing video")
+    def play_video(self, output: Optional[BinaryIO] = None) -> None:
+        """Play the video on the current page.
 
-    def print(self, from_page: int, to_page: int) -> None:
+        Args:
+            output: The stream the video is played to, discarded when
+            omitted.
+        """
+        print("Playing video")
+        self._play("video", output)
+
+    def _play(self, kind: str, output: Optional[BinaryIO]) -> None:
+        """Streams the media of a kind on the current page to output."""
+        path = media_path(self._open_store().path, self._current_page, kind)
+        if not os.path.exists(path):
+            print(f"No {kind} on page {self._current_page}")
+            return
+        with MediaStream(path) as stream:
+            for chunk in stream:
+                if output is not None:
+                    output.write(chunk)
+
+    def print(
+        self,
+        from_page: int,
+        to_page: int,
+        printer: Optional[BinaryIO] = None,
+    ) -> None:
         """Print one or more pages from the e-book.
 
         Args:
             from_page: The page to start printing from (inclusive).
             to_page: The last page that should be printed (inclusive).
+            printer: The stream rendered pages are sent to, standard
+            output when omitted.
         """
         print(f"Printing {from_page} to {to_page}")
+        print_pages(
+            self._open_store(),
+            from_page,
+            to_page,
+            self._columns(),
+            printer or sys.stdout.buffer,
+        )
 
 
 if __name__ == "__main__":
+    import io
+    import shutil
+    import tempfile
+
+    storage = tempfile.mkdtemp()
+    names = ("old_man_logan.cbt", "a_philosophy_of_software_design.azw3")
+    for name in names:
+        with open(os.path.join(storage, name), "w") as ebook:
+            ebook.write("\f".join(f"Page {index}" for index in range(100)))
+
     comicbook_reader = ComicBookReader(
         Display(size=6.8, ppi=300), storage_size=8
     )  # noqa
-    comicbook_reader.open(r"/storage/old_man_logan.cbt")
-    comicbook_reader.print(from_page=25, to_page=30)
+    comicbook_reader.open(os.path.join(storage, "old_man_logan.cbt"))
+    comicbook_reader.next_page()
+    comicbook_reader.display_page()
+    assert comicbook_reader.search('"page 42"') == [42]
+    comicbook_reader.add_bookmark()
+    comicbook_reader.go_to_page(90)
+    comicbook_reader.previous_bookmark()  # Back to page 1
+    comicbook_reader.set_zoom_level(200)
+    comicbook_reader.display_page()
+    comicbook_reader.set_zoom_level(100)
+    comicbook_reader.display_page()  # Served from the render cache
+    comicbook_reader.print(from_page=25, to_page=30, printer=io.BytesIO())
 
     assert isinstance(comicbook_reader, SupportsPrint)
+    assert supports(comicbook_reader, SupportsPrint)  # Cached per class
+    assert not supports(comicbook_reader, SupportsPlaySound)
 
     kindle_reader = KindleReader(Display(size=6, ppi=167), storage_size=4)
-    kindle_reader.open("/storage/a_philosophy_of_software_design.azw3")
-    kindle_reader.print(from_page=1, to_page=50)
-    kindle_reader.play_video()
+    kindle_reader.open(
+        os.path.join(storage, "a_philosophy_of_software_design.azw3")
+    )
+    kindle_reader.print(from_page=1, to_page=50, printer=io.BytesIO())
+    video_path = media_path(os.path.join(storage, names[1]), 0, "video")
+    os.makedirs(os.path.dirname(video_path))
+    with open(video_path, "wb") as video:
+        video.write(os.urandom(1 << 20))
+    kindle_reader.play_video(output=io.BytesIO())
 
     assert isinstance(kindle_reader, SupportsPrint)
     assert isinstance(kindle_reader, SupportsPlaySound)
     assert isinstance(kindle_reader, SupportsPlayVideo)
+    assert supports(kindle_reader, SupportsPlayVideo)
+
+    # Readers in a library share its caches and budget
+    library = Library(storage_size=4)
+    readers = [
+        KindleReader(Display(size=6, ppi=167), storage_size=4, library=library)
+        for _ in range(2)
+    ]
+    for reader, name in zip(readers, names):
+        nbytes = library.nbytes
+        reader.open(os.path.join(storage, name))
+        assert library.nbytes == nbytes  # Opening costs no memory
+        reader.display_page()
+    assert library.nbytes <= library.maxbytes
+
+    for reader in [comicbook_reader, kindle_reader, *readers]:
+        reader.close()
+    shutil.rmtree(storage)
@@ -0,0 +1,47 @@
+# library.py
+# !/usr/bin/env python3
+"""A library of open e-books that share one memory budget.
+
+On its own, every reader has a page cache and a render cache sized for the
+whole device, so a few open books together can use several times the
+memory the device can spare. A Library owns one page cache and one render
+cache for all the readers created with it, and splits one budget, the
+cache_budget() of the device, evenly between them:
+
+- Pages are keyed by e-book and evicted least recently used first across
+all e-books, so the pages of the book being read push out those of the
+books read longest ago.
+- Renders are evicted by GreedyDual-Size across all e-books, whose aging
+also favours the recently read books.
+
+Opening a book in a library costs no memory until its pages are displayed,
+and switching back to a recently read book finds its pages still cached.
+"""
+
+
+from page_store import PageCache, cache_budget
+from render_cache import RenderCache
+
+
+class Library:
+    """The caches shared by the e-books open on a device."""
+
+    def __init__(self, storage_size: int) -> None:
+        """Inits Library with the storage size of the device.
+
+        Args:
+            storage_size: The storage size of the device, in GB.
+        """
+        budget = cache_budget(storage_size)
+        self.pages = PageCache(budget // 2)
+        self.renders = RenderCache(budget - budget // 2)
+
+    @property
+    def maxbytes(self) -> int:
+        """The budget of both caches together, in bytes."""
+        return self.pages.maxbytes + self.renders.maxbytes
+
+    @property
+    def nbytes(self) -> int:
+        """The memory both caches hold, in bytes."""
+        return self.pages.nbytes + self.renders.nbytes
@@ -0,0 +1,159 @@
+# media_stream.py
+# !/usr/bin/env python3
+"""Streaming playback of the media embedded in an e-book.
+
+The sound or video of a page is stored in a media directory next to the
+e-book (see media_path()). MediaStream plays it without loading it: a
+read-ahead thread reads the file in fixed-size chunks into a ring buffer
+allocated once, and the consumer receives each chunk as a memoryview of the
+buffer, so no chunk is copied after it is read.
+
+Playback starts as soon as the first chunk is read, and memory use is the
+size of the ring buffer however long the media is. The read-ahead thread
+waits while every slot is full, and the consumer while every slot is
+empty.
+"""
+
+
+import os
+import threading
+from typing import BinaryIO, Final, Iterator, Optional
+
+MEDIA_SUFFIX: Final[str] = ".media"
+CHUNK_SIZE: Final[int] = 64 * 1024
+CHUNKS: Final[int] = 8  # Slots in the ring buffer
+
+
+def media_path(path_to_ebook: str, page: int, kind: str) -> str:
+    """Returns the pathname of the media embedded in a page.
+
+    Args:
+        path_to_ebook: The pathname of the e-book.
+        page: The page the media is on.
+        kind: The kind of media, "sound" or "video".
+    """
+    return os.path.join(path_to_ebook + MEDIA_SUFFIX, f"{page}.{kind}")
+
+
+class MediaStream:
+    """The chunks of a media file, read ahead into a ring buffer.
+
+    Iterating yields each chunk as a memoryview of the ring buffer. A
+    chunk is only valid until the next one is requested, when its slot is
+    handed back to the read-ahead thread; copy it to keep it longer.
+    """
+
+    def __init__(
+        self, path: str, chunk_size: int = CHUNK_SIZE, chunks: int = CHUNKS
+    ) -> None:
+        """Inits MediaStream and starts reading ahead.
+
+        Args:
+            path: The pathname of the media file.
+            chunk_size: The size of a chunk, in bytes.
+            chunks: The number of chunks the ring buffer holds.
+        """
+        self._file: BinaryIO = open(path, "rb", buffering=0)
+        self._chunk_size = chunk_size
+        self._buffer = memoryview(bytearray(chunk_size * chunks))
+        self._lengths = [0] * chunks
+        self._produced = 0  # Chunks read so far
+        self._consumed = 0  # Chunks handed back so far
+        self._finished = False
+        self._closed = False
+        self._error: Optional[Exception] = None
+        self._condition = threading.Condition()
+        self._reader = threading.Thread(
+            target=self._read_ahead, name="media-read-ahead", daemon=True
+        )
+        self._reader.start()
+
+    def _slot(self, count: int) -> memoryview:
+        start = (count % len(self._lengths)) * self._chunk_size
+        return self._buffer[start:start + self._chunk_size]
+
+    def _read_ahead(self) -> None:
+        try:
+            while True:
+                with self._condition:
+                    while (
+                        self._produced - self._consumed == len(self._lengths)
+                        and not self._closed
+                    ):
+                        self._condition.wait()
+                    if self._closed:
+                        return
+                    produced = self._produced
+                # The slot belongs to this thread until it is published,
+                # so it is filled without holding the lock
+                length = self._file.readinto(self._slot(produced)) or 0
+                with self._condition:
+                    if length == 0:
+                        self._finished = True
+                    else:
+                        self._lengths[produced % len(self._lengths)] = length
+                        self._produced += 1
+                    self._condition.notify_all()
+                if length == 0:
+                    return
+        except Exception as error:
+            with self._condition:
+                self._error = error
+                self._finished = True
+                self._condition.notify_all()
+
+    def __iter__(self) -> Iterator[memoryview]:
+        while True:
+            with self._condition:
+                while (
+                    self._consumed == self._produced
+                    and not self._finished
+                    and not self._closed
+                ):
+                    self._condition.wait()
+                if self._error is not None:
+                    raise self._error
+                if self._consumed == self._produced or self._closed:
+                    return
+                consumed = self._consumed
+            length = self._lengths[consumed % len(self._lengths)]
+            yield self._slot(consumed)[:length]
+            with self._condition:
+                self._consumed += 1  # Hands the slot back
+                self._condition.notify_all()
+
+    def close(self) -> None:
+        """Stops reading ahead and closes the media file."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._reader.join()
+        self._file.close()
+
+    def __enter__(self) -> "MediaStream":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    import hashlib
+    import tempfile
+    import time
+
+    with tempfile.NamedTemporaryFile() as media:
+        media.write(os.urandom(10 * CHUNK_SIZE * CHUNKS + 123))
+        media.flush()
+        media.seek(0)
+        expected = hashlib.sha256(media.read()).hexdigest()
+
+        start = time.perf_counter()
+        digest = hashlib.sha256()
+        with MediaStream(media.name) as stream:
+            for index, chunk in enumerate(stream):
+                if index == 0:
+                    first = time.perf_counter() - start
+                digest.update(chunk)
+        assert digest.hexdigest() == expected
+        print(f"First chunk after {first * 1000:.2f}ms")
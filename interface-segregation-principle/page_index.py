@@ -0,0 +1,157 @@
+# page_index.py
+# !/usr/bin/env python3
+"""An index of the byte offsets of the pages of an e-book.
+
+Finding page n of an e-book means finding the n-th page separator, which
+takes a scan from the start of the file. PageIndex records the offset and
+length of every page in two flat arrays, so any page is located in O(1).
+
+The index is built with one pass over the file and saved next to it, in a
+sidecar file named after the e-book with PAGES_SUFFIX appended. The sidecar
+records the size and modification time of the e-book it was built from; a
+sidecar that no longer matches is rebuilt.
+"""
+
+
+import os
+import struct
+import sys
+from array import array
+from typing import Final, Optional
+
+PAGE_SEPARATOR: Final[bytes] = b"\f"
+PAGES_SUFFIX: Final[str] = ".pages"
+
+# Magic, version, e-book size, e-book mtime (ns), page count
+_HEADER: Final[struct.Struct] = struct.Struct("<4sIqqq")
+_MAGIC: Final[bytes] = b"PIDX"
+_VERSION: Final[int] = 1
+
+
+class PageIndex:
+    """The offsets and lengths of the pages of an e-book."""
+
+    def __init__(self, offsets: array, lengths: array) -> None:
+        """Inits PageIndex with its arrays.
+
+        Args:
+            offsets: The offset of each page, an array of type "q".
+            lengths: The length of each page, an array of type "q".
+        """
+        self.offsets = offsets
+        self.lengths = lengths
+
+    @classmethod
+    def build(cls, data: bytes) -> "PageIndex":
+        """Returns the index of an e-book's contents.
+
+        Args:
+            data: The contents of the e-book, or a memory map of them.
+        """
+        offsets, lengths = array("q", [0]), array("q")
+        find = data.find
+        start = 0
+        separator = find(PAGE_SEPARATOR)
+        while separator >= 0:
+            lengths.append(separator - start)
+            start = separator + len(PAGE_SEPARATOR)
+            offsets.append(start)
+            separator = find(PAGE_SEPARATOR, start)
+        lengths.append(len(data) - start)
+        return cls(offsets, lengths)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def span(self, number: int) -> tuple[int, int]:
+        """Returns the start and end offsets of a page.
+
+        Raises:
+            IndexError: If the page does not exist.
+        """
+        if not 0 <= number < len(self.offsets):
+            raise IndexError(f"Page {number} is out of range.")
+        start = self.offsets[number]
+        return start, start + self.lengths[number]
+
+    def save(self, path: str, stat: os.stat_result) -> None:
+        """Writes the index to a sidecar file, atomically.
+
+        Args:
+            path: The pathname of the sidecar file.
+            stat: The status of the e-book the index was built from.
+        """
+        offsets, lengths = self.offsets, self.lengths
+        if sys.byteorder != "little":
+            offsets, lengths = array("q", offsets), array("q", lengths)
+            offsets.byteswap()
+            lengths.byteswap()
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    _VERSION,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    len(offsets),
+                )
+            )
+            offsets.tofile(file)
+            lengths.tofile(file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, stat: os.stat_result) -> Optional["PageIndex"]:
+        """Returns the index in a sidecar file, or None if it is stale.
+
+        Args:
+            path: The pathname of the sidecar file.
+            stat: The status of the e-book the index must match.
+        """
+        try:
+            with open(path, "rb") as file:
+                header = file.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return None
+                magic, version, size, mtime_ns, count = _HEADER.unpack(header)
+                if (magic, version, size, mtime_ns) != (
+                    _MAGIC,
+                    _VERSION,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ):
+                    return None
+                offsets, lengths = array("q"), array("q")
+                offsets.fromfile(file, count)
+                lengths.fromfile(file, count)
+        except (OSError, EOFError):
+            return None
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            lengths.byteswap()
+        return cls(offsets, lengths)
+
+
+def load_or_build(
+    path: str, data: bytes, stat: os.stat_result
+) -> PageIndex:
+    """Returns the index of an e-book, from its sidecar file when current.
+
+    A missing or stale sidecar is rebuilt. Failing to write it (on
+    read-only storage, for example) only costs the next open a rebuild.
+
+    Args:
+        path: The pathname of the e-book.
+        data: The contents of the e-book, or a memory map of them.
+        stat: The status of the e-book.
+    """
+    sidecar = path + PAGES_SUFFIX
+    index = PageIndex.load(sidecar, stat)
+    if index is None:
+        index = PageIndex.build(data)
+        try:
+            index.save(sidecar, stat)
+        except OSError:
+            pass
+    return index
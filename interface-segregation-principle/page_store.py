@@ -0,0 +1,196 @@
+# page_store.py
+# !/usr/bin/env python3
+"""Lazy, memory-mapped access to the pages of an e-book.
+
+An e-book file is UTF-8 text with its pages separated by form feeds ("\\f").
+PageStore memory-maps the file instead of reading it, so opening a book
+costs little however large it is; the operating system pages the file in
+as it is touched. Pages are located through a PageIndex, which is loaded
+from its sidecar file, or built with one pass over the file the first time
+the e-book is opened.
+
+Pages are decoded into str objects only when displayed, and PageCache keeps
+the recently displayed ones within a byte budget, evicting the least
+recently used page first. One PageCache may be shared by several e-books,
+in which case the least recently used page of any of them is evicted.
+
+Both classes are safe to use from several threads, so pages can be loaded
+in the background.
+"""
+
+
+import mmap
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Final, Hashable, Optional
+
+from page_index import PageIndex, load_or_build
+
+# The share of the device's storage that may hold decoded pages
+CACHE_SHARE: Final[int] = 1024
+MIN_CACHE_BYTES: Final[int] = 1 << 20
+
+
+def cache_budget(storage_size: int) -> int:
+    """Returns the page cache budget in bytes for a device.
+
+    Args:
+        storage_size: The storage size of the device, in GB.
+    """
+    return max(storage_size * (1 << 30) // CACHE_SHARE, MIN_CACHE_BYTES)
+
+
+class PageStore:
+    """The pages of an e-book file, located and read on demand."""
+
+    def __init__(self, path: str, index: Optional[PageIndex] = None) -> None:
+        """Inits PageStore by memory-mapping the e-book.
+
+        Args:
+            path: The pathname of the e-book.
+            index: The page index of the e-book, when it is already known.
+            Loaded from the sidecar file, or built, when omitted.
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            self.stat = os.fstat(file.fileno())
+            self.size = self.stat.st_size
+            # An empty file cannot be mapped, and holds a single empty page
+            self._data: Optional[mmap.mmap] = (
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if self.size
+                else None
+            )
+        if index is None:
+            index = load_or_build(
+                path, self._data if self._data is not None else b"", self.stat
+            )
+        self.index: PageIndex = index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def page_bytes(self, number: int) -> bytes:
+        """Returns the raw bytes of a page.
+
+        Raises:
+            IndexError: If the page does not exist.
+        """
+        start, end = self.index.span(number)
+        return self._data[start:end] if self._data is not None else b""
+
+    def page(self, number: int) -> str:
+        """Returns the text of a page.
+
+        Raises:
+            IndexError: If the page does not exist.
+        """
+        return self.page_bytes(number).decode("utf-8")
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    def __enter__(self) -> "PageStore":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class PageCache:
+    """Decoded pages, bounded by their total size in bytes.
+
+    Pages are keyed by (book, page number), so one cache can hold the pages
+    of several e-books; BookPages is the view of one e-book's pages.
+    """
+
+    def __init__(self, maxbytes: int) -> None:
+        """Inits PageCache with a byte budget.
+
+        Args:
+            maxbytes: The maximum total size of the cached pages.
+        """
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._pages: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Returns a cached page and marks it recently used, or None."""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def put(self, key: Hashable, page: str) -> None:
+        """Caches a page, evicting the least recently used pages.
+
+        A page larger than the whole budget is not cached.
+        """
+        size = sys.getsizeof(page)
+        if size > self.maxbytes:
+            return
+        with self._lock:
+            self._discard(key)
+            while self.nbytes + size > self.maxbytes:
+                _, evicted = self._pages.popitem(last=False)
+                self.nbytes -= sys.getsizeof(evicted)
+            self._pages[key] = page
+            self.nbytes += size
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def discard_book(self, book: Hashable) -> None:
+        """Discards the pages of one e-book."""
+        with self._lock:
+            for key in [key for key in self._pages if key[0] == book]:
+                self._discard(key)
+
+    def _discard(self, key: Hashable) -> None:
+        page = self._pages.pop(key, None)
+        if page is not None:
+            self.nbytes -= sys.getsizeof(page)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._pages
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self.nbytes = 0
+
+
+class BookPages:
+    """The pages of one e-book in a PageCache, keyed by page number."""
+
+    def __init__(self, cache: PageCache, book: Hashable) -> None:
+        """Inits BookPages with a cache and the key of the e-book in it.
+
+        Args:
+            cache: The cache, which may hold other e-books' pages too.
+            book: The key of the e-book.
+        """
+        self.cache = cache
+        self.book = book
+
+    def get(self, number: int) -> Optional[str]:
+        return self.cache.get((self.book, number))
+
+    def put(self, number: int, page: str) -> None:
+        self.cache.put((self.book, number), page)
+
+    def __contains__(self, number: object) -> bool:
+        return (self.book, number) in self.cache
+
+    def clear(self) -> None:
+        self.cache.discard_book(self.book)
@@ -0,0 +1,145 @@
+# prefetch.py
+# !/usr/bin/env python3
+"""Background prefetching of the pages a reader is about to turn to.
+
+Readers mostly turn pages one at a time in one direction. Prefetcher
+predicts that direction from the last few page turns and loads the next
+pages in that direction (and the one behind, for a reader who steps back)
+into the page cache on a background thread, so a page turn finds its page
+already decoded.
+
+A jump to another page cancels the loads that are no longer wanted and
+resets the prediction. A load that has already started is left to finish;
+its page simply lands in the cache.
+"""
+
+
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, Dict, Final
+
+from page_store import BookPages, PageCache
+
+DEPTH: Final[int] = 4  # Pages loaded ahead of the current page
+HISTORY: Final[int] = 4  # Page turns used to predict the direction
+
+
+class Prefetcher:
+    """Loads the pages around the current page ahead of time."""
+
+    def __init__(
+        self,
+        load: Callable[[int], str],
+        cache: BookPages,
+        depth: int = DEPTH,
+        history: int = HISTORY,
+    ) -> None:
+        """Inits Prefetcher with a page loader and the cache to fill.
+
+        Args:
+            load: Returns the page with a given number, raising IndexError
+            if there is none.
+            cache: The cache the loaded pages are put into.
+            depth: The number of pages to load ahead.
+            history: The number of page turns that predict the direction.
+        """
+        self._load = load
+        self._cache = cache
+        self._depth = depth
+        self._moves: deque[int] = deque(maxlen=history)
+        self._pending: Dict[int, Future] = {}
+        # Reentrant: cancelling a future, or adding a callback to one that
+        # is already done, runs its done callback (which takes the lock)
+        # right away
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="prefetch"
+        )
+
+    def direction(self) -> int:
+        """Returns the predicted reading direction, 1 or -1."""
+        return -1 if sum(self._moves) < 0 else 1
+
+    def moved(self, page: int, step: int) -> None:
+        """Schedules the pages around page after a move of step pages.
+
+        Args:
+            page: The new current page.
+            step: How far the reader moved: 1 or -1 for a page turn,
+            anything else for a jump.
+        """
+        if step in (1, -1):
+            self._moves.append(step)
+        else:
+            self._moves.clear()
+        ahead = self.direction()
+        wanted = [
+            page + ahead * distance for distance in range(1, self._depth + 1)
+        ]
+        wanted.append(page - ahead)
+
+        with self._lock:
+            for number in list(self._pending):
+                if number not in wanted:
+                    self._pending.pop(number).cancel()
+            for number in wanted:
+                if number < 0 or number in self._pending:
+                    continue
+                if number in self._cache:
+                    continue
+                future = self._executor.submit(self._fetch, number)
+                self._pending[number] = future
+                future.add_done_callback(
+                    lambda done, number=number: self._finished(number, done)
+                )
+
+    def wait(self, page: int) -> None:
+        """Waits for a scheduled load of page, if any, to finish."""
+        with self._lock:
+            future = self._pending.get(page)
+        if future is not None:
+            try:
+                future.result()
+            except CancelledError:
+                pass
+
+    def close(self) -> None:
+        """Cancels the scheduled loads and stops the worker."""
+        with self._lock:
+            self._pending.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _fetch(self, number: int) -> None:
+        if number in self._cache:
+            return
+        try:
+            page = self._load(number)
+        except IndexError:  # Past either end of the book
+            return
+        self._cache.put(number, page)
+
+    def _finished(self, number: int, future: Future) -> None:
+        with self._lock:
+            if self._pending.get(number) is future:
+                del self._pending[number]
+
+
+if __name__ == "__main__":
+    import time
+
+    def slow_load(number: int) -> str:
+        time.sleep(0.01)  # Stands in for decoding a page
+        return f"Page {number}"
+
+    cache = BookPages(PageCache(1 << 20), "demo")
+    prefetcher = Prefetcher(slow_load, cache)
+    for page in range(1, 6):
+        prefetcher.moved(page, 1)
+    time.sleep(0.1)
+    assert all(number in cache for number in range(6, 10))
+
+    prefetcher.moved(500, 495)  # A jump cancels what is not yet loaded
+    prefetcher.wait(501)
+    assert 501 in cache
+    prefetcher.close()
@@ -0,0 +1,125 @@
+# print_pipeline.py
+# !/usr/bin/env python3
+"""Renders a range of pages in parallel and streams them out in order.
+
+print_pages() renders pages on a pool of worker processes, so rendering
+scales with the cores available. Each worker maps the e-book itself, with
+the page index of the calling process handed to it once at startup, so
+no worker reads the sidecar file or rescans the book. Only page numbers
+are sent to the workers and only rendered pages come back.
+
+Pages are written in page order. At most `window` pages are in flight at
+once: a page is submitted only when the oldest one has been written, so
+memory use depends on the window and not on the length of the range. A
+slow page holds back the writes behind it, but not the rendering.
+
+Short ranges are rendered in the calling process, where starting the pool
+would cost more than it saves.
+"""
+
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO, Deque, Final, Optional
+
+from page_index import PageIndex
+from page_store import PageStore
+from rendering import render_page
+
+PAGE_BREAK: Final[bytes] = b"\f"
+PARALLEL_THRESHOLD: Final[int] = 16  # The shortest range rendered in parallel
+WINDOW_PER_WORKER: Final[int] = 4
+
+_worker_store: Optional[PageStore] = None
+
+
+def _open_store(path: str, index: PageIndex) -> None:
+    """Maps the e-book once per worker process."""
+    global _worker_store
+    _worker_store = PageStore(path, index)
+
+
+def _render(number: int, width: int) -> bytes:
+    assert _worker_store is not None
+    return render_page(_worker_store.page(number), width)
+
+
+def print_pages(
+    store: PageStore,
+    from_page: int,
+    to_page: int,
+    width: int,
+    out: BinaryIO,
+    max_workers: Optional[int] = None,
+    window: Optional[int] = None,
+) -> None:
+    """Renders pages and writes them to out in order, each followed by a
+    page break.
+
+    Args:
+        store: The pages of the e-book.
+        from_page: The page to start printing from (inclusive).
+        to_page: The last page that should be printed (inclusive).
+        width: The number of columns to render pages to.
+        out: The binary stream the pages are written to.
+        max_workers: The number of worker processes, os.cpu_count() when
+        omitted.
+        window: The maximum number of pages in flight,
+        WINDOW_PER_WORKER per worker when omitted.
+
+    Raises:
+        IndexError: If the range is not within the e-book.
+    """
+    if not 0 <= from_page <= to_page < len(store):
+        raise IndexError(
+            f"Pages {from_page} to {to_page} are out of range."
+        )
+    pages = range(from_page, to_page + 1)
+    max_workers = max_workers or os.cpu_count() or 1
+    if len(pages) < PARALLEL_THRESHOLD or max_workers == 1:
+        for number in pages:
+            out.write(render_page(store.page(number), width) + PAGE_BREAK)
+        return
+
+    window = window or WINDOW_PER_WORKER * max_workers
+    in_flight: Deque[Future] = deque()
+    numbers = iter(pages)
+    with ProcessPoolExecutor(
+        max_workers,
+        initializer=_open_store,
+        initargs=(store.path, store.index),
+    ) as executor:
+        for number in numbers:
+            in_flight.append(executor.submit(_render, number, width))
+            if len(in_flight) == window:
+                break
+        while in_flight:
+            out.write(in_flight.popleft().result() + PAGE_BREAK)
+            number = next(numbers, -1)
+            if number >= 0:
+                in_flight.append(executor.submit(_render, number, width))
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    import time
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "book.txt")
+    with open(path, "w") as book:
+        book.write(
+            "\f".join(
+                " ".join(f"word{index}" for index in range(5000))
+                for _ in range(500)
+            )
+        )
+
+    with PageStore(path) as store, open(os.devnull, "wb") as devnull:
+        for workers in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            print_pages(store, 0, 499, 60, devnull, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"{workers} worker(s): {500 / elapsed:,.0f} pages/s")
+    shutil.rmtree(directory)
@@ -0,0 +1,172 @@
+# render_cache.py
+# !/usr/bin/env python3
+"""A cache of rendered pages, shared by the readers with the same display.
+
+A rendered page depends on the e-book, the page, the zoom level and the
+display, so RenderCache keys renders by all of them, and readers with equal
+Displays (two devices of the same model, say) share one cache through
+shared_render_cache().
+
+The cache is bounded by the total size of the renders, and evicts with the
+GreedyDual-Size policy: every render has a priority of L + cost / size,
+where cost is the time it took to render and L is the priority of the last
+render evicted. The render with the lowest priority is evicted first, so
+renders that were expensive for their size (high zoom levels) stay longer,
+while L rising over time lets renders that are no longer used age out.
+"""
+
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Final, Hashable, List, Optional, Tuple
+
+# Gives the heap a compaction once it is this much larger than the cache
+_HEAP_SLACK: Final[int] = 64
+
+
+class _Render:
+    __slots__ = ("data", "cost", "priority", "sequence")
+
+    def __init__(self, data: bytes, cost: float) -> None:
+        self.data = data
+        self.cost = cost
+        self.priority = 0.0
+        self.sequence = 0
+
+
+class RenderCache:
+    """Rendered pages, bounded by their total size in bytes."""
+
+    def __init__(self, maxbytes: int) -> None:
+        """Inits RenderCache with a byte budget.
+
+        Args:
+            maxbytes: The maximum total size of the cached renders.
+        """
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._renders: Dict[Hashable, _Render] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._sequence = itertools.count()
+        self._inflation = 0.0  # L, the priority of the last eviction
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Returns a cached render and restores its priority, or None."""
+        with self._lock:
+            render = self._renders.get(key)
+            if render is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._prioritize(key, render)
+            return render.data
+
+    def put(self, key: Hashable, data: bytes, cost: float) -> None:
+        """Caches a render, evicting the renders with the lowest priority.
+
+        A render larger than the whole budget is not cached.
+
+        Args:
+            key: The key of the render.
+            data: The render.
+            cost: The time it took to render, in seconds.
+        """
+        if len(data) > self.maxbytes:
+            return
+        with self._lock:
+            self._discard(key)
+            while self.nbytes + len(data) > self.maxbytes:
+                self._evict()
+            render = _Render(data, cost)
+            self._renders[key] = render
+            self.nbytes += len(data)
+            self._prioritize(key, render)
+
+    def render(self, key: Hashable, render: Callable[[], bytes]) -> bytes:
+        """Returns the render of key, rendering and caching it if missing.
+
+        Args:
+            key: The key of the render.
+            render: Renders the page when it is not cached.
+        """
+        data = self.get(key)
+        if data is None:
+            start = time.perf_counter()
+            data = render()
+            self.put(key, data, time.perf_counter() - start)
+        return data
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._renders
+
+    def __len__(self) -> int:
+        return len(self._renders)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._renders.clear()
+            self._heap.clear()
+            self.nbytes = 0
+
+    def _prioritize(self, key: Hashable, render: _Render) -> None:
+        render.priority = self._inflation + render.cost / max(
+            len(render.data), 1
+        )
+        render.sequence = next(self._sequence)
+        heapq.heappush(self._heap, (render.priority, render.sequence, key))
+        if len(self._heap) > 2 * len(self._renders) + _HEAP_SLACK:
+            self._heap = [
+                (priority, sequence, key)
+                for priority, sequence, key in self._heap
+                if self._is_current(key, sequence)
+            ]
+            heapq.heapify(self._heap)
+
+    def _is_current(self, key: Hashable, sequence: int) -> bool:
+        """Returns whether a heap entry is the latest one of a render."""
+        render = self._renders.get(key)
+        return render is not None and render.sequence == sequence
+
+    def _evict(self) -> None:
+        """Evicts the render with the lowest priority.
+
+        Heap entries superseded by a later priority are discarded as they
+        reach the top.
+        """
+        while True:
+            priority, sequence, key = heapq.heappop(self._heap)
+            if self._is_current(key, sequence):
+                self._inflation = priority
+                self._discard(key)
+                return
+
+    def _discard(self, key: Hashable) -> None:
+        render = self._renders.pop(key, None)
+        if render is not None:
+            self.nbytes -= len(render.data)
+
+
+_shared: Dict[Hashable, RenderCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_render_cache(display: Hashable, maxbytes: int) -> RenderCache:
+    """Returns the render cache of the readers with a display.
+
+    The cache is created, with a budget of maxbytes, by the first reader
+    that asks for it.
+
+    Args:
+        display: The display of the reader.
+        maxbytes: The budget of the cache if it does not exist yet.
+    """
+    with _shared_lock:
+        cache = _shared.get(display)
+        if cache is None:
+            cache = _shared[display] = RenderCache(maxbytes)
+        return cache
@@ -0,0 +1,40 @@
+# rendering.py
+# !/usr/bin/env python3
+"""Rendering of e-book pages for a display.
+
+A page is rendered by wrapping its text to the number of columns that fit
+across the display at the reader's zoom level. The functions here are pure
+and defined at module level, so they can run in worker processes.
+"""
+
+
+import textwrap
+from typing import Final
+
+# The width of a display, as a share of its diagonal (a 3:5 aspect ratio)
+WIDTH_SHARE: Final[float] = 0.6
+# The width of a character at 100% zoom, in pixels
+CHARACTER_WIDTH: Final[int] = 24
+
+
+def columns(screen_size: float, ppi: int, zoom_level: int) -> int:
+    """Returns the number of characters that fit across a display.
+
+    Args:
+        screen_size: The diagonal of the display, in inches.
+        ppi: The pixel density of the display.
+        zoom_level: The zoom level, in percent.
+    """
+    width = screen_size * WIDTH_SHARE * ppi
+    return max(int(width * 100 / (CHARACTER_WIDTH * zoom_level)), 1)
+
+
+def render_page(text: str, width: int) -> bytes:
+    """Returns a page wrapped to width columns, encoded as UTF-8.
+
+    Line breaks in the text are kept; each line is wrapped on its own.
+    """
+    lines = []
+    for line in text.split("\n"):
+        lines.extend(textwrap.wrap(line, width) or [""])
+    return "\n".join(lines).encode("utf-8")
@@ -0,0 +1,264 @@
+# search_index.py
+# !/usr/bin/env python3
+"""A full-text search index over the pages of an e-book.
+
+SearchIndex is an inverted index: for every term, the pages it appears on
+and its positions on each page. Each term's postings are stored as one
+compressed byte string of variable-length integers (7 bits per byte, high
+bit set on all but the last byte), with pages and positions stored as
+deltas from the previous one, so most numbers take a single byte.
+
+Queries are whitespace-separated terms that must all appear on a page:
+
+- word: the exact term
+- prefix*: any term starting with prefix, found by bisecting the sorted
+terms
+- "a phrase": the terms in this order, next to each other
+
+The index is saved next to the e-book in a sidecar file named after it with
+SEARCH_SUFFIX appended, and validated by the e-book's size and modification
+time like the page index.
+"""
+
+
+import bisect
+import os
+import re
+import struct
+from typing import Dict, Final, Iterable, List, Optional, Set
+
+SEARCH_SUFFIX: Final[str] = ".search"
+
+_TOKEN: Final[re.Pattern] = re.compile(r"\w+")
+_QUERY: Final[re.Pattern] = re.compile(r'"([^"]*)"|(\S+)')
+
+# Magic, version, e-book size, e-book mtime (ns), term count
+_HEADER: Final[struct.Struct] = struct.Struct("<4sIqqq")
+_MAGIC: Final[bytes] = b"SIDX"
+_VERSION: Final[int] = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Returns the terms of a text, in order and lowercase."""
+    return _TOKEN.findall(text.lower())
+
+
+def _encode(value: int, out: bytearray) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode(data: bytes, offset: int) -> tuple[int, int]:
+    """Returns the integer at offset and the offset that follows it."""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class SearchIndex:
+    """An inverted index of the terms on the pages of an e-book."""
+
+    def __init__(self) -> None:
+        # term -> varints: (page delta, count, position deltas...)...
+        self._postings: Dict[str, bytearray] = {}
+        self._last_page: Dict[str, int] = {}
+        self._sorted_terms: Optional[List[str]] = None
+        self.pages = 0  # The number of pages added
+
+    @classmethod
+    def build(cls, pages: Iterable[str]) -> "SearchIndex":
+        """Returns the index of pages, numbered from 0."""
+        index = cls()
+        for page in pages:
+            index.add_page(page)
+        return index
+
+    def add_page(self, text: str) -> None:
+        """Adds the text of the next page to the index."""
+        number = self.pages
+        positions: Dict[str, List[int]] = {}
+        for position, term in enumerate(tokenize(text)):
+            positions.setdefault(term, []).append(position)
+
+        for term, term_positions in positions.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = bytearray()
+                self._sorted_terms = None
+            _encode(number - self._last_page.get(term, 0), postings)
+            _encode(len(term_positions), postings)
+            previous = 0
+            for position in term_positions:
+                _encode(position - previous, postings)
+                previous = position
+            self._last_page[term] = number
+        self.pages += 1
+
+    def _decode_postings(self, term: str) -> Dict[int, List[int]]:
+        """Returns the positions of a term, by page."""
+        data = self._postings.get(term)
+        result: Dict[int, List[int]] = {}
+        if data is None:
+            return result
+        offset = page = 0
+        while offset < len(data):
+            delta, offset = _decode(data, offset)
+            page += delta
+            count, offset = _decode(data, offset)
+            positions = result[page] = []
+            position = 0
+            for _ in range(count):
+                delta, offset = _decode(data, offset)
+                position += delta
+                positions.append(position)
+        return result
+
+    def _term_pages(self, term: str) -> Set[int]:
+        return set(self._decode_postings(term))
+
+    def _prefix_pages(self, prefix: str) -> Set[int]:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        pages: Set[int] = set()
+        index = bisect.bisect_left(terms, prefix)
+        while index < len(terms) and terms[index].startswith(prefix):
+            pages |= self._term_pages(terms[index])
+            index += 1
+        return pages
+
+    def _phrase_pages(self, terms: List[str]) -> Set[int]:
+        if len(terms) == 1:
+            return self._term_pages(terms[0])
+        postings = [self._decode_postings(term) for term in terms]
+        pages = set(postings[0]).intersection(*postings[1:])
+        matches = set()
+        for page in pages:
+            # Shift each term's positions back to where the phrase starts
+            starts = set(postings[0][page])
+            for offset, term_postings in enumerate(postings[1:], 1):
+                starts &= {
+                    position - offset for position in term_postings[page]
+                }
+                if not starts:
+                    break
+            if starts:
+                matches.add(page)
+        return matches
+
+    def search(self, query: str) -> List[int]:
+        """Returns the pages that match every part of a query, in order."""
+        result: Optional[Set[int]] = None
+        for phrase, word in _QUERY.findall(query):
+            if word.endswith("*") and len(tokenize(word)) == 1:
+                pages = self._prefix_pages(tokenize(word)[0])
+            else:
+                terms = tokenize(phrase or word)
+                if not terms:
+                    continue
+                pages = self._phrase_pages(terms)
+            result = pages if result is None else result & pages
+            if not result:
+                return []
+        return sorted(result or ())
+
+    def save(self, path: str, stat: os.stat_result) -> None:
+        """Writes the index to a sidecar file, atomically.
+
+        Args:
+            path: The pathname of the sidecar file.
+            stat: The status of the e-book the index was built from.
+        """
+        data = bytearray(
+            _HEADER.pack(
+                _MAGIC,
+                _VERSION,
+                stat.st_size,
+                stat.st_mtime_ns,
+                len(self._postings),
+            )
+        )
+        _encode(self.pages, data)
+        for term, postings in self._postings.items():
+            encoded = term.encode("utf-8")
+            _encode(len(encoded), data)
+            data += encoded
+            _encode(self._last_page[term], data)
+            _encode(len(postings), data)
+            data += postings
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, stat: os.stat_result) -> Optional["SearchIndex"]:
+        """Returns the index in a sidecar file, or None if it is stale.
+
+        Args:
+            path: The pathname of the sidecar file.
+            stat: The status of the e-book the index must match.
+        """
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, size, mtime_ns, count = _HEADER.unpack_from(data)
+        if (magic, version, size, mtime_ns) != (
+            _MAGIC,
+            _VERSION,
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return None
+
+        index = cls()
+        try:
+            index.pages, offset = _decode(data, _HEADER.size)
+            for _ in range(count):
+                length, offset = _decode(data, offset)
+                term = data[offset:offset + length].decode("utf-8")
+                offset += length
+                index._last_page[term], offset = _decode(data, offset)
+                length, offset = _decode(data, offset)
+                postings = bytearray(data[offset:offset + length])
+                index._postings[term] = postings
+                offset += length
+        except (IndexError, UnicodeDecodeError):  # A truncated file
+            return None
+        return index
+
+
+def load_or_build(
+    path: str, pages: Iterable[str], stat: os.stat_result
+) -> SearchIndex:
+    """Returns the search index of an e-book, from its sidecar file when
+    current.
+
+    A missing or stale sidecar is rebuilt from pages, and failing to write
+    it only costs the next search a rebuild.
+
+    Args:
+        path: The pathname of the e-book.
+        pages: The text of the e-book's pages, in order.
+        stat: The status of the e-book.
+    """
+    sidecar = path + SEARCH_SUFFIX
+    index = SearchIndex.load(sidecar, stat)
+    if index is None:
+        index = SearchIndex.build(pages)
+        try:
+            index.save(sidecar, stat)
+        except OSError:
+            pass
+    return index
@@ -0,0 +1,375 @@
+# cache_mapping.py
+# !/usr/bin/env python3
+"""A bounded cache with StrictMapping's rules.
+
+CacheStrictMapping rejects None keys and values like StrictMapping, and
+bounds itself by item count, by an estimated byte budget, or both. Entries
+may expire after a time to live (TTL).
+
+Eviction is delegated to a policy object (the strategy pattern), and both
+policies evict in O(1):
+
+- LRUPolicy: the least recently used key, kept in an OrderedDict.
+- LFUPolicy: the least frequently used key, kept in per-frequency buckets,
+with ties broken by recency.
+
+Expired entries are removed lazily: a lookup drops the entry it finds
+expired, and every write pops the entries whose deadlines have passed from
+a heap of deadlines. Nothing ever scans the whole table.
+"""
+
+
+import heapq
+import itertools
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Dict,
+    ItemsView,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Protocol,
+    Tuple,
+    ValuesView,
+)
+
+from liskov_substitution import _validate
+
+
+@dataclass
+class CacheStats:
+    """Counters for tuning the size of a cache.
+
+    Public attributes:
+    - hits
+    - misses
+    - evictions
+    - expirations
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class EvictionPolicy(Protocol):
+    """Protocol for classes that choose which key to evict."""
+
+    def add(self, key: object) -> None:
+        ...
+
+    def touch(self, key: object) -> None:
+        ...
+
+    def remove(self, key: object) -> None:
+        ...
+
+    def victim(self) -> object:
+        ...
+
+
+class LRUPolicy:
+    """Evicts the least recently used key."""
+
+    def __init__(self) -> None:
+        self._order: OrderedDict[object, None] = OrderedDict()
+
+    def add(self, key: object) -> None:
+        self._order[key] = None
+
+    def touch(self, key: object) -> None:
+        self._order.move_to_end(key)
+
+    def remove(self, key: object) -> None:
+        del self._order[key]
+
+    def victim(self) -> object:
+        return next(iter(self._order))
+
+
+class LFUPolicy:
+    """Evicts the least frequently used key, the least recent among ties."""
+
+    def __init__(self) -> None:
+        self._counts: Dict[object, int] = {}
+        self._buckets: Dict[int, OrderedDict[object, None]] = {}
+        self._min_count = 0
+
+    def add(self, key: object) -> None:
+        self._counts[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min_count = 1
+
+    def touch(self, key: object) -> None:
+        count = self._counts[key]
+        self._unlink(key, count)
+        if self._min_count == count and count not in self._buckets:
+            self._min_count = count + 1
+        self._counts[key] = count + 1
+        self._buckets.setdefault(count + 1, OrderedDict())[key] = None
+
+    def remove(self, key: object) -> None:
+        self._unlink(key, self._counts.pop(key))
+
+    def victim(self) -> object:
+        if self._min_count not in self._buckets:
+            # Only after remove() emptied the lowest bucket
+            self._min_count = min(self._buckets)
+        return next(iter(self._buckets[self._min_count]))
+
+    def _unlink(self, key: object, count: int) -> None:
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(
+        self, value: object, size: int, expires_at: Optional[float]
+    ) -> None:
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class CacheStrictMapping(MutableMapping):
+    """A bounded mapping object that maps keys to values.
+
+    Keys and values must not be None.
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        maxbytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        policy: Optional[EvictionPolicy] = None,
+        sizeof: Callable[[object], int] = sys.getsizeof,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Inits CacheStrictMapping with its limits.
+
+        Args:
+            maxsize: The maximum number of entries.
+            maxbytes: The maximum total size of the keys and values, as
+            estimated by sizeof.
+            ttl: The default time to live of an entry, in seconds.
+            policy: The eviction policy, LRUPolicy() when omitted.
+            sizeof: Returns the estimated size of a key or value in bytes.
+            clock: Returns the current time in seconds.
+        """
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        self._ttl = ttl
+        self._policy: EvictionPolicy = policy or LRUPolicy()
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: Dict[object, _Entry] = {}
+        self._bytes = 0
+        self._deadlines: List[Tuple[float, int, object, _Entry]] = []
+        self._sequence = itertools.count()
+        self.stats = CacheStats()
+
+    @property
+    def nbytes(self) -> int:
+        """The estimated size of all keys and values, in bytes."""
+        return self._bytes
+
+    def __getitem__(self, key: object) -> object:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            raise KeyError(key)
+        if entry.expires_at is not None and entry.expires_at <= self._clock():
+            self._drop(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            raise KeyError(key)
+        self.stats.hits += 1
+        self._policy.touch(key)
+        return entry.value
+
+    def __contains__(self, key: object) -> bool:
+        """Returns whether key is cached, without counting a lookup."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        return entry.expires_at is None or entry.expires_at > self._clock()
+
+    def __setitem__(self, key: object, item: object) -> None:
+        self.set(key, item)
+
+    def set(
+        self, key: object, item: object, ttl: Optional[float] = None
+    ) -> None:
+        """Sets key to item, evicting other entries to stay within limits.
+
+        Args:
+            key: The key.
+            item: The value.
+            ttl: The time to live in seconds, the default TTL when omitted.
+
+        Raises:
+            ValueError: If key or item is None, or if the entry alone is
+            larger than the byte budget.
+        """
+        _validate({key: item})
+        size = self._sizeof(key) + self._sizeof(item)
+        if self._maxbytes is not None and size > self._maxbytes:
+            raise ValueError(
+                f"Item of {size} bytes exceeds the {self._maxbytes} byte "
+                "budget."
+            )
+
+        ttl = self._ttl if ttl is None else ttl
+        now = self._clock()
+        expires_at = None if ttl is None else now + ttl
+        if key in self._entries:
+            self._drop(key)
+
+        # Make room first, so the new entry is never its own victim
+        self._expire(now)
+        while self._entries and self._over_limits(size):
+            self._drop(self._policy.victim())
+            self.stats.evictions += 1
+
+        entry = _Entry(item, size, expires_at)
+        self._entries[key] = entry
+        self._bytes += size
+        self._policy.add(key)
+        if expires_at is not None:
+            heapq.heappush(
+                self._deadlines,
+                (expires_at, next(self._sequence), key, entry),
+            )
+            if len(self._deadlines) > 2 * len(self._entries) + 64:
+                self._compact_deadlines()
+
+    def __delitem__(self, key: object) -> None:
+        if key not in self._entries:
+            raise KeyError(key)
+        self._drop(key)
+
+    def __iter__(self) -> Iterator:
+        self._expire(self._clock())
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        self._expire(self._clock())
+        return len(self._entries)
+
+    def items(self) -> ItemsView:
+        """Returns the items, without counting lookups or touching them."""
+        return _CacheItems(self)
+
+    def values(self) -> ValuesView:
+        """Returns the values, without counting lookups or touching them."""
+        return _CacheValues(self)
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._drop(key)
+        self._deadlines.clear()
+
+    def _over_limits(self, incoming: int) -> bool:
+        """Returns whether an entry of incoming bytes would not fit."""
+        if self._maxsize is not None and len(self._entries) >= self._maxsize:
+            return True
+        if self._maxbytes is None:
+            return False
+        return self._bytes + incoming > self._maxbytes
+
+    def _drop(self, key: object) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        self._policy.remove(key)
+
+    def _compact_deadlines(self) -> None:
+        """Drops the deadlines of replaced entries, amortized over writes."""
+        self._deadlines = [
+            deadline
+            for deadline in self._deadlines
+            if self._entries.get(deadline[2]) is deadline[3]
+        ]
+        heapq.heapify(self._deadlines)
+
+    def _expire(self, now: float) -> None:
+        """Drops the entries whose deadlines have passed.
+
+        Deadlines of entries that were since replaced or dropped are
+        discarded as they reach the top of the heap.
+        """
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, _, key, entry = heapq.heappop(deadlines)
+            if self._entries.get(key) is entry:
+                self._drop(key)
+                self.stats.expirations += 1
+
+
+class _CacheItems(ItemsView):
+    """The items of a cache, read from its entries directly."""
+
+    _mapping: CacheStrictMapping
+
+    def __contains__(self, item: object) -> bool:
+        key, value = item  # type: ignore
+        entry = self._mapping._entries.get(key)
+        return (
+            key in self._mapping
+            and entry is not None
+            and (entry.value is value or entry.value == value)
+        )
+
+    def __iter__(self) -> Iterator[Tuple[object, object]]:
+        cache = self._mapping
+        cache._expire(cache._clock())
+        return iter(
+            [(key, entry.value) for key, entry in cache._entries.items()]
+        )
+
+
+class _CacheValues(ValuesView):
+    """The values of a cache, read from its entries directly."""
+
+    _mapping: CacheStrictMapping
+
+    def __iter__(self) -> Iterator:
+        cache = self._mapping
+        cache._expire(cache._clock())
+        return iter([entry.value for entry in cache._entries.values()])
+
+
+if __name__ == "__main__":
+    cache = CacheStrictMapping(maxsize=2, policy=LFUPolicy())
+    cache["a"] = 1
+    cache["b"] = 2
+    cache["a"]
+    cache["c"] = 3  # Evicts "b", the least frequently used
+    assert "b" not in cache and cache.get("b") is None
+
+    now = [0.0]
+    cache = CacheStrictMapping(ttl=10, clock=lambda: now[0])
+    cache["key"] = "value"
+    now[0] = 11.0
+    assert cache.get("key") is None
+
+    cache["other"] = "value"
+    assert list(cache.items()) == [("other", "value")]
+    assert list(cache.values()) == ["value"]
+    assert cache.stats.hits == 0  # Iterating is not a lookup
+    print(cache.stats)
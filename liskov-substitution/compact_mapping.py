@@ -0,0 +1,298 @@
+# compact_mapping.py
+# !/usr/bin/env python3
+"""A compact, array-backed mapping with StrictMapping's rules.
+
+A dict of short strings to ints spends most of its memory on boxed objects:
+every key is a str object (about 50 bytes of overhead) and every value an
+int object, on top of the dict's own entry. CompactStrictMapping stores the
+same data in a handful of flat arrays instead:
+
+- the slots of an open-addressing hash table (linear probing), holding
+indices into the entry arrays
+- per entry: the low 32 bits of the key hash, the offset of the key in a
+packed UTF-8 byte arena (its length is the distance to the next offset),
+the value, and one byte for the kind of value
+- int values are stored inline as 64-bit integers; str values are stored in
+a second byte arena, each after a length prefix, with their offset in the
+value array
+
+Objects are only created when a key or value is read back. Deleted keys and
+overwritten str values leave dead bytes in the arenas, which are repacked
+together with the table once they outweigh the live bytes, or when the
+table next grows.
+"""
+
+
+from array import array
+from typing import Final, Iterator, MutableMapping, Tuple, Union
+
+from liskov_substitution import _validate
+
+MIN_SLOTS: Final[int] = 8
+MAX_LOAD: Final[float] = 2 / 3
+
+_EMPTY: Final[int] = -1
+_DELETED: Final[int] = -2
+_HASH_MASK: Final[int] = 0xFFFFFFFF
+_INT64_MIN: Final[int] = -(2**63)
+_INT64_MAX: Final[int] = 2**63 - 1
+
+# The kinds of entries
+_INT: Final[int] = 0
+_STR: Final[int] = 1
+_GONE: Final[int] = 2  # A deleted entry
+
+# A str length below _LONG is stored in one prefix byte, a longer one in
+# _LONG followed by 8 bytes
+_LONG: Final[int] = 0xFF
+
+Value = Union[int, str]
+
+
+def _prefixed(encoded: bytes) -> bytes:
+    """Returns the encoded str with its length prefix."""
+    length = len(encoded)
+    if length < _LONG:
+        return bytes((length,)) + encoded
+    return bytes((_LONG,)) + length.to_bytes(8, "little") + encoded
+
+
+def _string_size(strings: bytearray, offset: int) -> int:
+    """Returns the bytes of the str stored at offset, prefix included."""
+    length = strings[offset]
+    if length < _LONG:
+        return 1 + length
+    return 9 + int.from_bytes(strings[offset + 1:offset + 9], "little")
+
+
+class CompactStrictMapping(MutableMapping):
+    """A memory-efficient mapping object that maps str keys to values.
+
+    Keys must be str. Values must be int (64-bit) or str. Keys and values
+    must not be None.
+    """
+
+    def __init__(self) -> None:
+        self._clear(MIN_SLOTS)
+
+    def _clear(self, slots: int) -> None:
+        self._slots = array("i", [_EMPTY]) * slots
+        self._hashes = array("I")
+        # One more offset than entries, so every key ends where the next
+        # one starts. Widened to 64 bits if the arena outgrows 32 bits.
+        self._key_offsets = array("I", [0])
+        self._values = array("q")  # The int, or the offset of the str
+        self._kinds = bytearray()
+        self._keys = bytearray()
+        self._strings = bytearray()
+        self._dead_bytes = 0  # Bytes of the arenas no entry refers to
+        self._count = 0
+        self._used_slots = 0  # Occupied or deleted
+
+    def _lookup(self, key: bytes, key_hash: int) -> Tuple[int, int]:
+        """Returns the slot of a key and its entry, or -1 if missing.
+
+        When the key is missing, the slot is the first free one on its
+        probe sequence.
+        """
+        slots, hashes = self._slots, self._hashes
+        offsets, keys = self._key_offsets, self._keys
+        mask = len(slots) - 1
+        key_hash &= _HASH_MASK
+        slot = key_hash & mask
+        free = -1
+        while True:
+            entry = slots[slot]
+            if entry == _EMPTY:
+                return (slot if free < 0 else free), -1
+            if entry == _DELETED:
+                if free < 0:
+                    free = slot
+            elif (
+                hashes[entry] == key_hash
+                and keys[offsets[entry]:offsets[entry + 1]] == key
+            ):
+                return slot, entry
+            slot = (slot + 1) & mask
+
+    def _value(self, entry: int) -> Value:
+        if self._kinds[entry] == _INT:
+            return self._values[entry]
+        strings = self._strings
+        offset = self._values[entry]
+        length = strings[offset]
+        if length < _LONG:
+            return strings[offset + 1:offset + 1 + length].decode("utf-8")
+        length = int.from_bytes(strings[offset + 1:offset + 9], "little")
+        return strings[offset + 9:offset + 9 + length].decode("utf-8")
+
+    def _store_value(self, entry: int, item: Value) -> None:
+        if isinstance(item, str):
+            self._values[entry] = len(self._strings)
+            self._kinds[entry] = _STR
+            self._strings += _prefixed(item.encode("utf-8"))
+        else:
+            self._values[entry] = item
+            self._kinds[entry] = _INT
+
+    def _release(self, entry: int) -> None:
+        """Counts the str value of an entry as dead."""
+        if self._kinds[entry] == _STR:
+            self._dead_bytes += _string_size(
+                self._strings, self._values[entry]
+            )
+
+    def _repack_if_wasteful(self) -> None:
+        if self._dead_bytes * 2 > len(self._keys) + len(self._strings):
+            self._rebuild()
+
+    def __getitem__(self, key: object) -> Value:
+        if not isinstance(key, str):
+            raise KeyError(key)
+        entry = self._lookup(key.encode("utf-8"), hash(key))[1]
+        if entry < 0:
+            raise KeyError(key)
+        return self._value(entry)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        return self._lookup(key.encode("utf-8"), hash(key))[1] >= 0
+
+    def __setitem__(self, key: object, item: object) -> None:
+        _validate({key: item})
+        if not isinstance(key, str):
+            raise TypeError(f"Key must be str, not {type(key).__name__}.")
+        if isinstance(item, bool) or not isinstance(item, (int, str)):
+            raise TypeError(
+                f"Item must be int or str, not {type(item).__name__}."
+            )
+        if isinstance(item, int) and not _INT64_MIN <= item <= _INT64_MAX:
+            raise OverflowError("Item does not fit in 64 bits.")
+
+        encoded = key.encode("utf-8")
+        key_hash = hash(key)
+        slot, entry = self._lookup(encoded, key_hash)
+        if entry >= 0:
+            self._release(entry)
+            self._store_value(entry, item)
+            self._repack_if_wasteful()
+            return
+
+        if (self._used_slots + 1) > len(self._slots) * MAX_LOAD:
+            self._rebuild()
+            slot = self._lookup(encoded, key_hash)[0]
+        entry = len(self._hashes)
+        self._hashes.append(key_hash & _HASH_MASK)
+        self._keys += encoded
+        self._append_key_offset(len(self._keys))
+        self._values.append(0)
+        self._kinds.append(_INT)
+        self._store_value(entry, item)
+        if self._slots[slot] == _EMPTY:
+            self._used_slots += 1
+        self._slots[slot] = entry
+        self._count += 1
+
+    def _append_key_offset(self, offset: int) -> None:
+        if offset > _HASH_MASK and self._key_offsets.typecode == "I":
+            self._key_offsets = array("q", self._key_offsets)
+        self._key_offsets.append(offset)
+
+    def __delitem__(self, key: object) -> None:
+        if not isinstance(key, str):
+            raise KeyError(key)
+        slot, entry = self._lookup(key.encode("utf-8"), hash(key))
+        if entry < 0:
+            raise KeyError(key)
+        self._release(entry)
+        offsets = self._key_offsets
+        self._dead_bytes += offsets[entry + 1] - offsets[entry]
+        self._slots[slot] = _DELETED
+        self._kinds[entry] = _GONE
+        self._count -= 1
+        self._repack_if_wasteful()
+
+    def __iter__(self) -> Iterator[str]:
+        keys, offsets, kinds = self._keys, self._key_offsets, self._kinds
+        for entry in range(len(kinds)):
+            if kinds[entry] != _GONE:
+                yield keys[offsets[entry]:offsets[entry + 1]].decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        self._clear(MIN_SLOTS)
+
+    def _rebuild(self) -> None:
+        """Sizes the table for the live entries and repacks them and both
+        arenas.
+
+        Keys and str values are copied as bytes, so no objects are created.
+        """
+        hashes, key_offsets = self._hashes, self._key_offsets
+        values, kinds = self._values, self._kinds
+        keys, strings = self._keys, self._strings
+
+        slots = MIN_SLOTS
+        while slots * MAX_LOAD < (self._count + 1) * 2:
+            slots *= 2
+        self._clear(slots)
+        mask = slots - 1
+        for entry in range(len(kinds)):
+            kind = kinds[entry]
+            if kind == _GONE:
+                continue
+            key_hash = hashes[entry]
+            slot = key_hash & mask
+            while self._slots[slot] != _EMPTY:
+                slot = (slot + 1) & mask
+            self._slots[slot] = len(self._hashes)
+
+            self._hashes.append(key_hash)
+            self._keys += keys[key_offsets[entry]:key_offsets[entry + 1]]
+            self._append_key_offset(len(self._keys))
+            if kind == _INT:
+                self._values.append(values[entry])
+            else:
+                offset = values[entry]
+                size = _string_size(strings, offset)
+                self._values.append(len(self._strings))
+                self._strings += strings[offset:offset + size]
+            self._kinds.append(kind)
+            self._count += 1
+            self._used_slots += 1
+
+    def nbytes(self) -> int:
+        """Returns the bytes held by the arrays and arenas."""
+        arrays = (self._slots, self._hashes, self._key_offsets, self._values)
+        return (
+            sum(len(a) * a.itemsize for a in arrays)
+            + len(self._kinds)
+            + len(self._keys)
+            + len(self._strings)
+        )
+
+
+if __name__ == "__main__":
+    compact_mapping = CompactStrictMapping()
+    compact_mapping.update({f"user:{index}": index for index in range(1000)})
+    compact_mapping["user:0"] = "replaced"
+    del compact_mapping["user:1"]
+
+    assert len(compact_mapping) == 999
+    assert compact_mapping["user:0"] == "replaced"
+    assert compact_mapping["user:999"] == 999
+    assert "user:1" not in compact_mapping
+
+    compact_mapping["long"] = "x" * 1000
+    assert compact_mapping["long"] == "x" * 1000
+    nbytes = compact_mapping.nbytes()
+    for index in range(10_000):  # Dead str values are reclaimed
+        compact_mapping["user:0"] = f"replaced {index}"
+    assert compact_mapping.nbytes() < nbytes * 2
+    assert compact_mapping["user:0"] == "replaced 9999"
+    assert sorted(compact_mapping) == sorted(
+        ["long", "user:0"] + [f"user:{index}" for index in range(2, 1000)]
+    )
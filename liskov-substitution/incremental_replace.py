@@ -0,0 +1,165 @@
+# incremental_replace.py
+# !/usr/bin/env python3
+"""Diff-based replacement of mapping values.
+
+replace_values() writes every key of the incoming document, even when most
+values are unchanged. replace_values_incremental() first computes the delta
+between the mapping and the document (added, changed and removed keys) and
+writes only that delta. The delta is returned as a Patch, which can be
+applied to another mapping or serialized to JSON and shipped elsewhere.
+
+The diff walks the smaller of the two sides in Python. Keys that only exist
+on the larger side are found with a keys-view difference, and only when
+the counts show that such keys exist, so a large, mostly unchanged reload
+costs little more than the lookups themselves.
+"""
+
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, MutableMapping
+
+_MISSING: Any = object()
+
+
+@dataclass
+class Patch:
+    """The changes that turn one mapping into another.
+
+    Public attributes:
+    - added: keys that are new, with their values
+    - changed: keys whose values changed, with their new values
+    - removed: keys that are gone
+    """
+
+    added: Dict[object, object] = field(default_factory=dict)
+    changed: Dict[object, object] = field(default_factory=dict)
+    removed: List[object] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def apply(self, mapping: MutableMapping) -> None:
+        """Applies the patch to the mapping.
+
+        Additions and changes are written with a single update(), so a
+        StrictMapping validates all of them before writing any.
+        """
+        if self.added or self.changed:
+            mapping.update({**self.added, **self.changed})
+        for key in self.removed:
+            del mapping[key]
+
+    def to_json(self) -> str:
+        """Returns the patch as a JSON document."""
+        return json.dumps(
+            {
+                "added": self.added,
+                "changed": self.changed,
+                "removed": self.removed,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, json_doc: str) -> "Patch":
+        """Returns the patch of a JSON document made by to_json()."""
+        obj = json.loads(json_doc)
+        return cls(obj["added"], obj["changed"], obj["removed"])
+
+
+def _same(old: object, value: object) -> bool:
+    """Returns whether a value is unchanged.
+
+    1, True and 1.0 compare equal but are different JSON values, so the
+    types must match too, down to the items of lists, tuples and dicts.
+    """
+    if old is value:
+        return True
+    if type(old) is not type(value):
+        return False
+    if isinstance(old, (list, tuple)) and isinstance(value, (list, tuple)):
+        return len(old) == len(value) and all(map(_same, old, value))
+    if isinstance(old, dict) and isinstance(value, dict):
+        return old.keys() == value.keys() and all(
+            _same(item, value[key]) for key, item in old.items()
+        )
+    return old == value
+
+
+def diff(current: Mapping, incoming: Mapping) -> Patch:
+    """Returns the patch that turns current into incoming.
+
+    Args:
+        current: The mapping as it is.
+        incoming: The mapping as it should be.
+    """
+    patch = Patch()
+    if len(incoming) <= len(current):
+        for key, value in incoming.items():
+            old = current.get(key, _MISSING)
+            if old is _MISSING:
+                patch.added[key] = value
+            elif not _same(old, value):
+                patch.changed[key] = value
+        # Every incoming key that is not new matched a current key
+        if len(incoming) - len(patch.added) < len(current):
+            patch.removed = list(current.keys() - incoming.keys())
+    else:
+        for key, old in current.items():
+            value = incoming.get(key, _MISSING)
+            if value is _MISSING:
+                patch.removed.append(key)
+            elif not _same(old, value):
+                patch.changed[key] = value
+        if len(current) - len(patch.removed) < len(incoming):
+            for key in incoming.keys() - current.keys():
+                patch.added[key] = incoming[key]
+    return patch
+
+
+def replace_values_incremental(
+    mapping: MutableMapping, json_doc: str, remove_missing: bool = True
+) -> Patch:
+    """Replace the values of mapping with the values of the provided JSON
+    document, writing only what changed.
+
+    Args:
+        mapping: A mutable mapping.
+        json_doc: String representation of the JSON document.
+        remove_missing: Whether to remove keys that are not in the
+        document.
+
+    Returns:
+        The patch that was applied.
+    """
+    obj: dict = json.loads(json_doc)
+    patch = diff(mapping, obj)
+    if not remove_missing:
+        patch.removed = []
+    patch.apply(mapping)
+    return patch
+
+
+if __name__ == "__main__":
+    from liskov_substitution import StrictMapping
+
+    strict_mapping = StrictMapping()
+    strict_mapping.update({"a": 1, "b": 2, "c": 3})
+
+    patch = replace_values_incremental(strict_mapping, '{"a": 1, "b": 20}')
+    print(patch)  # Only "b" is written and "c" removed
+
+    replica = StrictMapping()
+    replica.update({"a": 1, "b": 2, "c": 3})
+    Patch.from_json(patch.to_json()).apply(replica)
+    assert dict(replica.items()) == dict(strict_mapping.items())
+
+    patch = replace_values_incremental(strict_mapping, '{"a": true, "b": 20}')
+    assert patch.changed == {"a": True} and strict_mapping["a"] is True
+
+    # Nested values are compared by type too
+    assert diff({"a": [1]}, {"a": [True]}).changed == {"a": [True]}
+    assert diff({"a": {"x": 1}}, {"a": {"x": 1.0}}).changed == {
+        "a": {"x": 1.0}
+    }
+    assert not diff({"a": [1, {"x": "y"}]}, {"a": [1, {"x": "y"}]})
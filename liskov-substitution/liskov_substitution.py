@@ -39,13 +39,40 @@ Source: Adaptive Code, Second Edition (Microsoft Press, 2017)
 """
 
 import json
-from typing import Iterator, MutableMapping
+from itertools import repeat
+from operator import is_
+from typing import (
+    Any,
+    ItemsView,
+    Iterator,
+    KeysView,
+    MutableMapping,
+    ValuesView,
+)
+
+_MISSING: Any = object()
+
+
+def _validate(items: dict) -> None:
+    """Raises ValueError if a key or value of items is None.
+
+    Both checks run in C: the key check is a single hash lookup and the
+    value check maps operator.is_ over the values.
+    """
+    if None in items:
+        raise ValueError("Key cannot be None.")
+    if any(map(is_, items.values(), repeat(None))):
+        raise ValueError("Item cannot be None.")
 
 
 class StrictMapping(MutableMapping):
     """A mapping object that maps keys to values.
 
     Keys and values must not be None.
+
+    The MutableMapping mixin methods are overridden to delegate to the
+    underlying dict, whose implementations run in C instead of calling
+    __getitem__ and __setitem__ once per key.
     """
 
     def __init__(self) -> None:
@@ -72,18 +99,49 @@ class StrictMapping(MutableMapping):
     def __len__(self) -> int:
         return len(self.mapping)
 
+    def __contains__(self, key: object) -> bool:
+        # The mixin relies on __getitem__ raising KeyError, which it does
+        # not, so every key would appear to be present.
+        return key in self.mapping
+
+    def get(self, key: object, default: object = None) -> object:
+        return self.mapping.get(key, default)
+
+    def keys(self) -> KeysView:
+        return self.mapping.keys()
 
-# Create an instance of a built-in dict
-std_dict: dict = {}
-std_dict["key"] = "value"
+    def items(self) -> ItemsView:
+        return self.mapping.items()
 
-assert isinstance(std_dict, MutableMapping)
+    def values(self) -> ValuesView:
+        return self.mapping.values()
 
-# Create an instance of a StrictMapping
-strict_mapping: StrictMapping = StrictMapping()
-strict_mapping["key"] = "value"
+    def pop(self, key: object, default: object = _MISSING) -> object:
+        if default is _MISSING:
+            return self.mapping.pop(key)
+        return self.mapping.pop(key, default)
 
-assert isinstance(strict_mapping, MutableMapping)
+    def popitem(self) -> tuple:
+        return self.mapping.popitem()
+
+    def clear(self) -> None:
+        self.mapping.clear()
+
+    def setdefault(self, key: object, default: object = None) -> object:
+        if key in self.mapping:
+            return self.mapping[key]
+        self[key] = default
+        return default
+
+    def update(self, other: Any = (), /, **kwargs: object) -> None:
+        """Updates the mapping from a mapping or iterable and keywords.
+
+        All items are validated before any is written, so a rejected
+        update leaves the mapping unchanged.
+        """
+        items = dict(other, **kwargs)
+        _validate(items)
+        self.mapping.update(items)
 
 
 # We just want to work with a MutableMapping, we do not care about a
@@ -102,8 +160,21 @@ def replace_values(mapping: MutableMapping, json_doc: str) -> None:
         mapping[key] = value
 
 
-replace_values(std_dict, '{"key": null}')  # Works!
-replace_values(strict_mapping, '{"key": null}')  # Oops.. ValueError
+if __name__ == "__main__":
+    # Create an instance of a built-in dict
+    std_dict: dict = {}
+    std_dict["key"] = "value"
+
+    assert isinstance(std_dict, MutableMapping)
+
+    # Create an instance of a StrictMapping
+    strict_mapping: StrictMapping = StrictMapping()
+    strict_mapping["key"] = "value"
+
+    assert isinstance(strict_mapping, MutableMapping)
+
+    replace_values(std_dict, '{"key": null}')  # Works!
+    replace_values(strict_mapping, '{"key": null}')  # Oops.. ValueError
 
 
 # In this case StrictMapping is not substitutable for a MutableMapping
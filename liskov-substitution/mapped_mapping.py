@@ -0,0 +1,348 @@
+# mapped_mapping.py
+# !/usr/bin/env python3
+"""A persistent, memory-mapped mapping with StrictMapping's rules.
+
+MappedStrictMapping keeps its items on disk in two files:
+
+- <path>.dat: an append-only log of records (key length, value length, key
+bytes, pickled value bytes). Setting a key appends a record, so writes are
+sequential and never move existing data.
+- <path>.idx: an open-addressing hash table of (hash, record offset) slots,
+probed linearly. Lookups are O(1) on average and read only the slots and
+the one matching record.
+
+Both files are memory-mapped, so opening a mapping does no loading at all
+and pages are only read as they are touched. Reader processes that open the
+same files share those pages through the OS page cache. Only one process
+may write at a time, and readers should reopen after the writer resizes the
+index or compacts.
+
+Overwritten and deleted records stay in the log until compact() is called.
+"""
+
+
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+from typing import Final, Iterator, MutableMapping, Optional, Tuple
+
+from liskov_substitution import _validate
+
+MIN_SLOTS: Final[int] = 1024
+MAX_LOAD: Final[float] = 0.5
+
+_INDEX_MAGIC: Final[int] = int.from_bytes(b"SMIDX001", "little")
+_DATA_MAGIC: Final[bytes] = b"SMDAT001"
+_HEADER_WORDS: Final[int] = 4  # magic, slots, count, used
+_EMPTY: Final[int] = 0
+_TOMBSTONE: Final[int] = 2**64 - 1
+_RECORD = struct.Struct("<II")  # key length, value length
+
+
+def _encode_key(key: object) -> bytes:
+    """Returns the stored form of a key, tagged with its type."""
+    if isinstance(key, str):
+        return b"s" + key.encode("utf-8")
+    if isinstance(key, bytes):
+        return b"b" + key
+    raise TypeError(f"Key must be str or bytes, not {type(key).__name__}.")
+
+
+def _decode_key(data: bytes) -> object:
+    if data[:1] == b"s":
+        return data[1:].decode("utf-8")
+    return data[1:]
+
+
+def _hash(encoded_key: bytes) -> int:
+    """Returns a hash that is stable across processes (unlike hash())."""
+    digest = hashlib.blake2b(encoded_key, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class MappedStrictMapping(MutableMapping):
+    """A disk-backed mapping object that maps keys to values.
+
+    Keys must be str or bytes and values must be picklable. Keys and values
+    must not be None.
+    """
+
+    def __init__(self, path: str, readonly: bool = False) -> None:
+        """Opens the mapping at path, creating it if needed.
+
+        Args:
+            path: The path prefix of the .idx and .dat files.
+            readonly: Whether to open without write access.
+        """
+        self._path = path
+        self._readonly = readonly
+        if not readonly and not os.path.exists(self._data_path):
+            self._create_data(self._data_path)
+            self._create_index(self._index_path, MIN_SLOTS)
+        self._data_file = open(self._data_path, "rb" if readonly else "r+b")
+        self._data_map: Optional[mmap.mmap] = None
+        self._index_file = open(self._index_path, "rb" if readonly else "r+b")
+        self._index_map: Optional[mmap.mmap] = None
+        self._words: Optional[memoryview] = None
+        self._map_index()
+        self._map_data()
+
+    @property
+    def _data_path(self) -> str:
+        return f"{self._path}.dat"
+
+    @property
+    def _index_path(self) -> str:
+        return f"{self._path}.idx"
+
+    @staticmethod
+    def _create_data(path: str) -> None:
+        """Creates an empty log."""
+        with open(path, "wb") as data_file:
+            data_file.write(_DATA_MAGIC)
+
+    @staticmethod
+    def _create_index(path: str, slots: int) -> None:
+        """Creates an empty index with a power-of-two number of slots."""
+        with open(path, "wb") as index_file:
+            index_file.truncate((_HEADER_WORDS + 2 * slots) * 8)
+            index_file.write(struct.pack("<4Q", _INDEX_MAGIC, slots, 0, 0))
+
+    def _map_index(self) -> None:
+        access = mmap.ACCESS_READ if self._readonly else mmap.ACCESS_WRITE
+        self._index_map = mmap.mmap(
+            self._index_file.fileno(), 0, access=access
+        )
+        self._words = memoryview(self._index_map).cast("Q")
+        if self._words[0] != _INDEX_MAGIC:
+            raise ValueError(f"{self._index_path} is not a mapping index.")
+
+    def _map_data(self) -> None:
+        self._data_map = mmap.mmap(
+            self._data_file.fileno(), 0, access=mmap.ACCESS_READ
+        )
+        if self._data_map[: len(_DATA_MAGIC)] != _DATA_MAGIC:
+            raise ValueError(f"{self._data_path} is not a mapping log.")
+
+    def _unmap(self) -> None:
+        # The memoryview must be released before its mmap can be closed
+        if self._words is not None:
+            self._words.release()
+            self._words = None
+        for mapped in (self._index_map, self._data_map):
+            if mapped is not None:
+                mapped.close()
+        self._index_map = self._data_map = None
+
+    def _record(self, offset: int) -> Tuple[bytes, memoryview]:
+        """Returns the key bytes and the value bytes of a record."""
+        assert self._data_map is not None
+        if offset + _RECORD.size > len(self._data_map):
+            self._map_data()  # The log grew since it was mapped
+        key_length, value_length = _RECORD.unpack_from(self._data_map, offset)
+        start = offset + _RECORD.size
+        if start + key_length + value_length > len(self._data_map):
+            self._map_data()
+        key = self._data_map[start:start + key_length]
+        start += key_length
+        value = memoryview(self._data_map)[start:start + value_length]
+        return key, value
+
+    def _find(self, encoded_key: bytes, key_hash: int) -> Tuple[int, bool]:
+        """Returns the slot of a key and whether the key was found.
+
+        When the key is missing, the slot is the first free one on its
+        probe sequence (preferring a tombstone to an empty slot).
+        """
+        words = self._words
+        assert words is not None
+        mask = words[1] - 1
+        slot = key_hash & mask
+        free = -1
+        while True:
+            ref = words[_HEADER_WORDS + 2 * slot + 1]
+            if ref == _EMPTY:
+                return (slot if free < 0 else free), False
+            if ref == _TOMBSTONE:
+                if free < 0:
+                    free = slot
+            elif words[_HEADER_WORDS + 2 * slot] == key_hash:
+                if self._record(ref)[0] == encoded_key:
+                    return slot, True
+            slot = (slot + 1) & mask
+
+    def __getitem__(self, key: object) -> object:
+        encoded_key = _encode_key(key)
+        assert self._words is not None
+        slot, found = self._find(encoded_key, _hash(encoded_key))
+        if not found:
+            raise KeyError(key)
+        ref = self._words[_HEADER_WORDS + 2 * slot + 1]
+        value = self._record(ref)[1]
+        try:
+            return pickle.loads(value)
+        finally:
+            value.release()
+
+    def __setitem__(self, key: object, item: object) -> None:
+        _validate({key: item})
+        self._check_writable()
+        encoded_key = _encode_key(key)
+        value = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store(encoded_key, _hash(encoded_key), value)
+
+    def _store(self, encoded_key: bytes, key_hash: int, value: bytes) -> None:
+        """Appends a record and points the key's slot at it."""
+        assert self._words is not None
+        if (self._words[3] + 1) > self._words[1] * MAX_LOAD:
+            self._resize()
+        slot, found = self._find(encoded_key, key_hash)
+
+        offset = self._data_file.seek(0, os.SEEK_END)
+        self._data_file.write(_RECORD.pack(len(encoded_key), len(value)))
+        self._data_file.write(encoded_key)
+        self._data_file.write(value)
+        self._data_file.flush()
+
+        words = self._words
+        was_empty = words[_HEADER_WORDS + 2 * slot + 1] == _EMPTY
+        words[_HEADER_WORDS + 2 * slot] = key_hash
+        words[_HEADER_WORDS + 2 * slot + 1] = offset
+        if not found:
+            words[2] += 1
+            if was_empty:
+                words[3] += 1
+
+    def __delitem__(self, key: object) -> None:
+        self._check_writable()
+        encoded_key = _encode_key(key)
+        slot, found = self._find(encoded_key, _hash(encoded_key))
+        if not found:
+            raise KeyError(key)
+        assert self._words is not None
+        self._words[_HEADER_WORDS + 2 * slot + 1] = _TOMBSTONE
+        self._words[2] -= 1
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            encoded_key = _encode_key(key)
+        except TypeError:
+            return False
+        return self._find(encoded_key, _hash(encoded_key))[1]
+
+    def __iter__(self) -> Iterator:
+        for _, ref in self._live_slots():
+            yield _decode_key(self._record(ref)[0])
+
+    def __len__(self) -> int:
+        assert self._words is not None
+        return self._words[2]
+
+    def _live_slots(self) -> Iterator[Tuple[int, int]]:
+        """Yields the (hash, offset) of each live slot."""
+        words = self._words
+        assert words is not None
+        for slot in range(words[1]):
+            ref = words[_HEADER_WORDS + 2 * slot + 1]
+            if ref != _EMPTY and ref != _TOMBSTONE:
+                yield words[_HEADER_WORDS + 2 * slot], ref
+
+    def _check_writable(self) -> None:
+        if self._readonly:
+            raise TypeError(f"{self._path} was opened read-only.")
+
+    def _resize(self) -> None:
+        """Rebuilds the index with room to grow, dropping tombstones.
+
+        Only the slots are rehashed; the log is not read.
+        """
+        slots = MIN_SLOTS
+        while len(self) * 4 > slots:
+            slots *= 2
+        temporary = f"{self._index_path}.tmp"
+        self._create_index(temporary, slots)
+        with open(temporary, "r+b") as index_file:
+            with mmap.mmap(index_file.fileno(), 0) as index_map:
+                words = memoryview(index_map).cast("Q")
+                mask = slots - 1
+                for key_hash, ref in self._live_slots():
+                    slot = key_hash & mask
+                    while words[_HEADER_WORDS + 2 * slot + 1] != _EMPTY:
+                        slot = (slot + 1) & mask
+                    words[_HEADER_WORDS + 2 * slot] = key_hash
+                    words[_HEADER_WORDS + 2 * slot + 1] = ref
+                words[2] = words[3] = len(self)
+                words.release()
+        self._replace(temporary, None)
+
+    def _replace(self, index_path: str, data_path: Optional[str]) -> None:
+        """Swaps in a new index (and log) and maps them."""
+        self._unmap()
+        self._index_file.close()
+        os.replace(index_path, self._index_path)
+        if data_path is not None:
+            self._data_file.close()
+            os.replace(data_path, self._data_path)
+            self._data_file = open(self._data_path, "r+b")
+        self._index_file = open(self._index_path, "r+b")
+        self._map_index()
+        self._map_data()
+
+    def compact(self) -> None:
+        """Rewrites the log without overwritten or deleted records.
+
+        The live records are copied to a new mapping next to this one, which
+        then replaces it. The copy is not decoded or re-pickled.
+        """
+        self._check_writable()
+        temporary = f"{self._path}.compact"
+        for path in (f"{temporary}.dat", f"{temporary}.idx"):
+            if os.path.exists(path):
+                os.remove(path)
+        with MappedStrictMapping(temporary) as compacted:
+            for key_hash, ref in self._live_slots():
+                key, value = self._record(ref)
+                try:
+                    compacted._store(key, key_hash, bytes(value))
+                finally:
+                    value.release()
+        self._replace(f"{temporary}.idx", f"{temporary}.dat")
+
+    def flush(self) -> None:
+        """Writes the index to disk and syncs the log."""
+        if self._index_map is not None and not self._readonly:
+            self._index_map.flush()
+            os.fsync(self._data_file.fileno())
+
+    def close(self) -> None:
+        """Flushes and closes the mapping."""
+        self.flush()
+        self._unmap()
+        self._index_file.close()
+        self._data_file.close()
+
+    def __enter__(self) -> "MappedStrictMapping":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "lookup")
+        with MappedStrictMapping(path) as mapped:
+            mapped.update({f"key{index}": index for index in range(10_000)})
+            mapped["key0"] = "replaced"
+            del mapped["key1"]
+            mapped.compact()
+
+        # Reopening maps the files without loading anything
+        with MappedStrictMapping(path, readonly=True) as mapped:
+            assert len(mapped) == 9_999
+            assert mapped["key0"] == "replaced"
+            assert "key1" not in mapped
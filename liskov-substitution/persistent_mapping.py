@@ -0,0 +1,344 @@
+# persistent_mapping.py
+# !/usr/bin/env python3
+"""A mapping with StrictMapping's rules and O(1) copy-on-write snapshots.
+
+The items are stored in a hash array mapped trie (HAMT): a tree of nodes
+with up to 32 children each, indexed by successive 5-bit slices of the key
+hash. Nodes are never modified. A write copies only the nodes on the path to
+the changed key (O(log32 n) of them) and swaps in the new root with a single
+assignment, so:
+
+- snapshot() is O(1): it keeps a reference to the current root.
+- A snapshot never changes, however the mapping is written afterwards, so a
+long scan sees one consistent version and never fails with "dictionary
+changed size during iteration".
+- Readers take no locks, so writers never block them.
+- A snapshot costs memory only for the nodes replaced since it was taken.
+"""
+
+
+import threading
+from typing import (
+    Any,
+    ItemsView,
+    Iterator,
+    KeysView,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+    ValuesView,
+)
+
+from liskov_substitution import _validate
+
+_BITS = 5
+_WIDTH_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+_MISSING: Any = object()
+
+# A leaf is a (hash, key, value) tuple
+_Leaf = Tuple[int, object, object]
+
+
+class _BitmapNode:
+    """A node whose bitmap marks which of its 32 slots are occupied."""
+
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple) -> None:
+        self.bitmap = bitmap
+        self.entries = entries
+
+
+class _CollisionNode:
+    """A node for keys whose 64-bit hashes are identical."""
+
+    __slots__ = ("key_hash", "items")
+
+    def __init__(self, key_hash: int, items: tuple) -> None:
+        self.key_hash = key_hash
+        self.items = items
+
+
+_Node = Union[_BitmapNode, _CollisionNode]
+
+_EMPTY = _BitmapNode(0, ())
+
+
+def _hash(key: object) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _find(node: _Node, key_hash: int, key: object) -> object:
+    """Returns the value of key, or _MISSING."""
+    shift = 0
+    while True:
+        if isinstance(node, _CollisionNode):
+            for item_key, value in node.items:
+                if item_key is key or item_key == key:
+                    return value
+            return _MISSING
+        bit = 1 << ((key_hash >> shift) & _WIDTH_MASK)
+        if not node.bitmap & bit:
+            return _MISSING
+        entry = node.entries[(node.bitmap & (bit - 1)).bit_count()]
+        if isinstance(entry, tuple):
+            if entry[0] == key_hash and (entry[1] is key or entry[1] == key):
+                return entry[2]
+            return _MISSING
+        node = entry
+        shift += _BITS
+
+
+def _merge(first: _Leaf, second: _Leaf, shift: int) -> _Node:
+    """Returns a node holding two leaves with different keys."""
+    if shift >= _HASH_BITS:
+        return _CollisionNode(
+            first[0], ((first[1], first[2]), (second[1], second[2]))
+        )
+    first_slot = (first[0] >> shift) & _WIDTH_MASK
+    second_slot = (second[0] >> shift) & _WIDTH_MASK
+    if first_slot == second_slot:
+        child = _merge(first, second, shift + _BITS)
+        return _BitmapNode(1 << first_slot, (child,))
+    if first_slot > second_slot:
+        first, second = second, first
+        first_slot, second_slot = second_slot, first_slot
+    return _BitmapNode((1 << first_slot) | (1 << second_slot), (first, second))
+
+
+def _assoc(node: _Node, leaf: _Leaf, shift: int) -> Tuple[_Node, bool]:
+    """Returns a copy of node with leaf set, and whether the key is new."""
+    key_hash, key, value = leaf
+    if isinstance(node, _CollisionNode):
+        items = node.items
+        for index, (item_key, _) in enumerate(items):
+            if item_key is key or item_key == key:
+                items = items[:index] + ((key, value),) + items[index + 1:]
+                return _CollisionNode(key_hash, items), False
+        return _CollisionNode(key_hash, items + ((key, value),)), True
+
+    bit = 1 << ((key_hash >> shift) & _WIDTH_MASK)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    entries = node.entries
+    if not node.bitmap & bit:
+        entries = entries[:index] + (leaf,) + entries[index:]
+        return _BitmapNode(node.bitmap | bit, entries), True
+
+    entry = entries[index]
+    added = False
+    if isinstance(entry, tuple):
+        if entry[0] == key_hash and (entry[1] is key or entry[1] == key):
+            if entry[2] is value:
+                return node, False
+            replacement: Union[_Leaf, _Node] = leaf
+        else:
+            replacement, added = _merge(entry, leaf, shift + _BITS), True
+    else:
+        replacement, added = _assoc(entry, leaf, shift + _BITS)
+        if replacement is entry:
+            return node, False
+    entries = entries[:index] + (replacement,) + entries[index + 1:]
+    return _BitmapNode(node.bitmap, entries), added
+
+
+def _without(node: _Node, key_hash: int, key: object, shift: int) -> _Node:
+    """Returns a copy of node without key.
+
+    Raises:
+        KeyError: If key is missing.
+    """
+    if isinstance(node, _CollisionNode):
+        items = tuple(
+            item
+            for item in node.items
+            if not (item[0] is key or item[0] == key)
+        )
+        if len(items) == len(node.items):
+            raise KeyError(key)
+        return _CollisionNode(key_hash, items)
+
+    bit = 1 << ((key_hash >> shift) & _WIDTH_MASK)
+    if not node.bitmap & bit:
+        raise KeyError(key)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    entry = node.entries[index]
+    if isinstance(entry, tuple):
+        if not (entry[0] == key_hash and (entry[1] is key or entry[1] == key)):
+            raise KeyError(key)
+        replacement: Optional[Union[_Leaf, _Node]] = None
+    else:
+        child = _without(entry, key_hash, key, shift + _BITS)
+        replacement = child
+        # Pull a lone leaf up so the trie stays as shallow as possible
+        if isinstance(child, _BitmapNode) and len(child.entries) == 1:
+            if isinstance(child.entries[0], tuple):
+                replacement = child.entries[0]
+        elif isinstance(child, _CollisionNode) and not child.items:
+            replacement = None
+        elif isinstance(child, _BitmapNode) and not child.entries:
+            replacement = None
+
+    entries = node.entries
+    if replacement is None:
+        entries = entries[:index] + entries[index + 1:]
+        return _BitmapNode(node.bitmap & ~bit, entries)
+    entries = entries[:index] + (replacement,) + entries[index + 1:]
+    return _BitmapNode(node.bitmap, entries)
+
+
+def _iterate(node: _Node) -> Iterator[Tuple[object, object]]:
+    """Yields the (key, value) pairs under node."""
+    if isinstance(node, _CollisionNode):
+        yield from node.items
+        return
+    for entry in node.entries:
+        if isinstance(entry, tuple):
+            yield entry[1], entry[2]
+        else:
+            yield from _iterate(entry)
+
+
+class MappingSnapshot(Mapping):
+    """An immutable, consistent view of a PersistentStrictMapping."""
+
+    def __init__(self, root: _Node, count: int) -> None:
+        self._root = root
+        self._count = count
+
+    def __getitem__(self, key: object) -> object:
+        value = _find(self._root, _hash(key), key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return _find(self._root, _hash(key), key) is not _MISSING
+
+    def __iter__(self) -> Iterator:
+        return (key for key, _ in _iterate(self._root))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self) -> ItemsView:
+        return _SnapshotItems(self)
+
+    def values(self) -> ValuesView:
+        return _SnapshotValues(self)
+
+
+class _SnapshotItems(ItemsView):
+    """The items of a snapshot, iterated straight from the trie."""
+
+    _mapping: MappingSnapshot
+
+    def __iter__(self) -> Iterator[Tuple[object, object]]:
+        return _iterate(self._mapping._root)
+
+
+class _SnapshotValues(ValuesView):
+    """The values of a snapshot, iterated straight from the trie."""
+
+    _mapping: MappingSnapshot
+
+    def __iter__(self) -> Iterator:
+        return (value for _, value in _iterate(self._mapping._root))
+
+
+class PersistentStrictMapping(MutableMapping):
+    """A mapping object that maps keys to values, with snapshots.
+
+    Keys and values must not be None. Iterating over the mapping iterates
+    over a snapshot taken when iteration starts, and keys(), items() and
+    values() are views of a snapshot taken when they are called, so keys
+    and values always come from the same version.
+    """
+
+    def __init__(self) -> None:
+        # The root and the count are swapped together as one tuple, so a
+        # reader always sees a matching pair without taking the lock.
+        self._state: Tuple[_Node, int] = (_EMPTY, 0)
+        self._write_lock = threading.Lock()
+
+    def snapshot(self) -> MappingSnapshot:
+        """Returns an immutable view of the current version in O(1)."""
+        return MappingSnapshot(*self._state)
+
+    def __getitem__(self, key: object) -> object:
+        value = _find(self._state[0], _hash(key), key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return _find(self._state[0], _hash(key), key) is not _MISSING
+
+    def __setitem__(self, key: object, item: object) -> None:
+        _validate({key: item})
+        leaf = (_hash(key), key, item)
+        with self._write_lock:
+            root, count = self._state
+            root, added = _assoc(root, leaf, 0)
+            self._state = (root, count + added)
+
+    def __delitem__(self, key: object) -> None:
+        with self._write_lock:
+            root, count = self._state
+            self._state = (_without(root, _hash(key), key, 0), count - 1)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.snapshot())
+
+    def __len__(self) -> int:
+        return self._state[1]
+
+    def keys(self) -> KeysView:
+        return self.snapshot().keys()
+
+    def items(self) -> ItemsView:
+        return self.snapshot().items()
+
+    def values(self) -> ValuesView:
+        return self.snapshot().values()
+
+    def update(self, other: Any = (), /, **kwargs: object) -> None:
+        """Updates the mapping from a mapping or iterable and keywords.
+
+        All items are validated first and published as one new version, so
+        readers see either none or all of the update.
+        """
+        items = dict(other, **kwargs)
+        _validate(items)
+        with self._write_lock:
+            root, count = self._state
+            for key, item in items.items():
+                root, added = _assoc(root, (_hash(key), key, item), 0)
+                count += added
+            self._state = (root, count)
+
+    def clear(self) -> None:
+        with self._write_lock:
+            self._state = (_EMPTY, 0)
+
+
+if __name__ == "__main__":
+    persistent_mapping = PersistentStrictMapping()
+    persistent_mapping.update({f"key{index}": index for index in range(1000)})
+
+    before = persistent_mapping.snapshot()
+    for key in persistent_mapping:  # Iterates over a snapshot
+        persistent_mapping[f"new-{key}"] = 0  # No "changed size" error
+    del persistent_mapping["key0"]
+
+    assert len(before) == 1000 and before["key0"] == 0
+    assert len(persistent_mapping) == 1999
+    assert "key0" not in persistent_mapping
+
+    for key, value in persistent_mapping.items():
+        del persistent_mapping[key]  # Items come from one version
+    assert not persistent_mapping and len(before.values()) == 1000
@@ -0,0 +1,241 @@
+# sharded_mapping.py
+# !/usr/bin/env python3
+"""A thread-safe mapping with StrictMapping's rules and striped locks.
+
+Keys are spread across a fixed number of shards by hash. Each shard is a
+dict guarded by its own lock, so threads working on different shards never
+wait for each other. Every operation holds a lock rather than relying on
+the GIL, so the mapping stays correct on free-threaded builds (3.13+), where
+operations on different shards also run in parallel.
+
+Compound operations (setdefault, compare_and_set, update) are atomic.
+items(), values() and comparisons read a snapshot(), so no read ever looks
+up a key outside the lock of its shard.
+update() locks every shard it touches, in shard order so that concurrent
+updates cannot deadlock, and validates everything before writing anything.
+"""
+
+
+import threading
+from typing import (
+    Any,
+    Dict,
+    Final,
+    ItemsView,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    ValuesView,
+)
+
+from liskov_substitution import _validate
+
+SHARDS: Final[int] = 16
+
+_MISSING: Any = object()
+
+
+class ShardedStrictMapping(MutableMapping):
+    """A thread-safe mapping object that maps keys to values.
+
+    Keys and values must not be None.
+    """
+
+    def __init__(self, shards: int = SHARDS) -> None:
+        """Inits ShardedStrictMapping with a number of shards.
+
+        Args:
+            shards: The number of shards (and locks).
+        """
+        self._shards: List[dict] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard(self, key: object) -> int:
+        return hash(key) % len(self._shards)
+
+    def __getitem__(self, key: object) -> object:
+        index = self._shard(key)
+        with self._locks[index]:
+            return self._shards[index][key]
+
+    def __setitem__(self, key: object, item: object) -> None:
+        _validate({key: item})
+        index = self._shard(key)
+        with self._locks[index]:
+            self._shards[index][key] = item
+
+    def __delitem__(self, key: object) -> None:
+        index = self._shard(key)
+        with self._locks[index]:
+            del self._shards[index][key]
+
+    def __contains__(self, key: object) -> bool:
+        index = self._shard(key)
+        with self._locks[index]:
+            return key in self._shards[index]
+
+    def __iter__(self) -> Iterator:
+        """Iterates over a copy of the keys, taken one shard at a time.
+
+        The copy of each shard is consistent, but the shards are not copied
+        at the same instant.
+        """
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                keys = list(shard)
+            yield from keys
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def get(self, key: object, default: object = None) -> object:
+        index = self._shard(key)
+        with self._locks[index]:
+            return self._shards[index].get(key, default)
+
+    def pop(self, key: object, default: object = _MISSING) -> object:
+        index = self._shard(key)
+        with self._locks[index]:
+            if default is _MISSING:
+                return self._shards[index].pop(key)
+            return self._shards[index].pop(key, default)
+
+    def setdefault(self, key: object, default: object = None) -> object:
+        """Returns the value of key, setting it to default if missing."""
+        index = self._shard(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            if key in shard:
+                return shard[key]
+            _validate({key: default})
+            shard[key] = default
+            return default
+
+    def compare_and_set(
+        self, key: object, expected: object, item: object
+    ) -> bool:
+        """Sets key to item only if its current value is expected.
+
+        Args:
+            key: The key to set.
+            expected: The value key must currently have, or None for a key
+            that must not exist yet.
+            item: The new value.
+
+        Returns:
+            Whether the value was set.
+        """
+        _validate({key: item})
+        index = self._shard(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            if shard.get(key) != expected:
+                return False
+            shard[key] = item
+            return True
+
+    def update(self, other: Any = (), /, **kwargs: object) -> None:
+        """Updates the mapping atomically from a mapping or iterable.
+
+        All items are validated before any is written, and no reader sees
+        part of the update in the shards it touches.
+        """
+        items = dict(other, **kwargs)
+        _validate(items)
+
+        by_shard: Dict[int, List[Tuple[object, object]]] = {}
+        for key, item in items.items():
+            by_shard.setdefault(self._shard(key), []).append((key, item))
+        order = sorted(by_shard)
+        for index in order:
+            self._locks[index].acquire()
+        try:
+            for index in order:
+                self._shards[index].update(by_shard[index])
+        finally:
+            for index in order:
+                self._locks[index].release()
+
+    def popitem(self) -> Tuple[object, object]:
+        """Removes and returns an item of the first shard that has one.
+
+        Raises:
+            KeyError: If the mapping is empty.
+        """
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                if shard:
+                    return shard.popitem()
+        raise KeyError("popitem(): mapping is empty")
+
+    def items(self) -> ItemsView:
+        """Returns the items of a snapshot()."""
+        return self.snapshot().items()
+
+    def values(self) -> ValuesView:
+        """Returns the values of a snapshot()."""
+        return self.snapshot().values()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return self.snapshot() == dict(other.items())
+
+    def clear(self) -> None:
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                shard.clear()
+
+    def snapshot(self) -> Dict[object, object]:
+        """Returns a copy of all items taken with every shard locked."""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            result: Dict[object, object] = {}
+            for shard in self._shards:
+                result.update(shard)
+            return result
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+
+def _example_counter(mapping: ShardedStrictMapping, key: str) -> None:
+    """Increments key with compare_and_set, retrying on conflicts."""
+    while True:
+        current: Optional[int] = mapping.get(key)  # type: ignore
+        if mapping.compare_and_set(key, current, (current or 0) + 1):
+            return
+
+
+if __name__ == "__main__":
+    sharded_mapping = ShardedStrictMapping()
+    threads = [
+        threading.Thread(
+            target=lambda: [
+                _example_counter(sharded_mapping, "hits") for _ in range(1000)
+            ]
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sharded_mapping["hits"] == 8000
+
+    def churn() -> None:
+        for index in range(20_000):
+            sharded_mapping.update({index: index})
+            sharded_mapping.pop(index - 10, None)
+
+    writer = threading.Thread(target=churn)
+    writer.start()
+    while writer.is_alive():  # Reads never see a key vanish mid-lookup
+        list(sharded_mapping.items())
+        list(sharded_mapping.values())
+    writer.join()
+    assert sharded_mapping == sharded_mapping.snapshot()
@@ -0,0 +1,68 @@
+# sharded_mapping_benchmark.py
+# !/usr/bin/env python3
+"""Benchmarks ShardedStrictMapping under a read-heavy threaded workload.
+
+A mapping with a single shard behaves like a dict behind one global lock,
+so it is the baseline. Each thread performs OPERATIONS operations, of which
+READ_RATIO are reads, and the total throughput is reported per thread
+count. Throughput only scales with threads on a free-threaded build; with
+the GIL the numbers show the cost of lock contention instead.
+
+Usage: python sharded_mapping_benchmark.py
+"""
+
+
+import random
+import sys
+import threading
+import time
+from typing import Final, List
+
+from sharded_mapping import SHARDS, ShardedStrictMapping
+
+KEYS: Final[int] = 10_000
+OPERATIONS: Final[int] = 200_000
+READ_RATIO: Final[float] = 0.95
+THREADS: Final[List[int]] = [1, 2, 4, 8]
+
+
+def _worker(
+    mapping: ShardedStrictMapping, seed: int, barrier: threading.Barrier
+) -> None:
+    rng = random.Random(seed)
+    keys = [rng.randrange(KEYS) for _ in range(OPERATIONS)]
+    reads = [rng.random() < READ_RATIO for _ in range(OPERATIONS)]
+    barrier.wait()
+    for key, read in zip(keys, reads):
+        if read:
+            mapping.get(key)
+        else:
+            mapping[key] = key
+
+
+def throughput(shards: int, threads: int) -> float:
+    """Returns the operations per second across all threads."""
+    mapping = ShardedStrictMapping(shards)
+    mapping.update({key: key for key in range(KEYS)})
+    barrier = threading.Barrier(threads + 1)
+    workers = [
+        threading.Thread(target=_worker, args=(mapping, seed, barrier))
+        for seed in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return threads * OPERATIONS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)
+    print(f"GIL enabled: {is_gil_enabled()}")
+    print(f"{'threads':>7} {'1 shard':>14} {f'{SHARDS} shards':>14}")
+    for threads in THREADS:
+        single = throughput(1, threads)
+        sharded = throughput(SHARDS, threads)
+        print(f"{threads:>7} {single:>12,.0f}/s {sharded:>12,.0f}/s")
@@ -0,0 +1,228 @@
+# streaming_replace.py
+# !/usr/bin/env python3
+"""Streaming replacement of mapping values from large JSON documents.
+
+replace_values() loads the whole document and writes one key at a time,
+printing a line per key. replace_values_streaming() reads the document in
+fixed-size chunks, decodes one key/value pair at a time and applies them in
+batches through the mapping's update(), then logs a single summary.
+
+Peak memory is bounded by the chunk size, the batch size and twice the
+largest single value, regardless of the size of the document.
+"""
+
+
+import json
+import logging
+from typing import (
+    IO,
+    Dict,
+    Final,
+    Iterator,
+    MutableMapping,
+    Optional,
+    Tuple,
+)
+
+CHUNK_SIZE: Final[int] = 64 * 1024
+BATCH_SIZE: Final[int] = 10_000
+
+logger = logging.getLogger(__name__)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE: Final[str] = " \t\n\r"
+_NUMBER_CHARS: Final[str] = "0123456789.eE+-"
+
+
+class _Reader:
+    """A window over a text stream that is refilled one chunk at a time."""
+
+    def __init__(self, stream: IO[str], chunk_size: int) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self, size: Optional[int] = None) -> bool:
+        """Reads another chunk, dropping what was consumed.
+
+        Args:
+            size: The number of characters to read, the chunk size when
+            omitted.
+
+        Returns False at the end of the stream.
+        """
+        if self.eof:
+            return False
+        chunk = self._stream.read(size or self._chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def skip_whitespace(self) -> None:
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in _WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer) or not self.fill():
+                return
+
+    def expect(self, *tokens: str) -> str:
+        """Consumes and returns the next token, which must be one of tokens.
+
+        Raises:
+            ValueError: If the next token is not one of tokens.
+        """
+        self.skip_whitespace()
+        if self.position >= len(self.buffer):
+            raise ValueError("Unexpected end of JSON document.")
+        token = self.buffer[self.position]
+        if token not in tokens:
+            raise ValueError(
+                f"Expected one of {tokens!r} but found {token!r} at "
+                f"offset {self.position}."
+            )
+        self.position += 1
+        return token
+
+    def expect_end(self) -> None:
+        """Checks that only whitespace is left.
+
+        Raises:
+            ValueError: If anything else follows.
+        """
+        self.skip_whitespace()
+        if self.position < len(self.buffer):
+            raise ValueError(
+                f"Extra data at offset {self.position}: "
+                f"{self.buffer[self.position:self.position + 20]!r}."
+            )
+
+    def value(self) -> object:
+        """Decodes and consumes the next JSON value.
+
+        A number split across chunks decodes as a shorter number (e.g. "-1"
+        from "-1.5"), so a number that is not followed by a delimiter is
+        decoded again once more data is available.
+
+        Each retry reads at least as much as is already buffered, so the
+        window doubles and a value spanning many chunks is decoded a
+        logarithmic number of times, in linear time overall.
+        """
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self.fill(self._retry_size()):
+                    raise
+                continue
+            if self._may_continue(value, end) and self.fill(
+                self._retry_size()
+            ):
+                continue
+            self.position = end
+            return value
+
+    def _retry_size(self) -> int:
+        return max(self._chunk_size, len(self.buffer) - self.position)
+
+    def _may_continue(self, value: object, end: int) -> bool:
+        if end == len(self.buffer):
+            return True
+        is_number = isinstance(value, (int, float)) and not isinstance(
+            value, bool
+        )
+        return is_number and self.buffer[end] in _NUMBER_CHARS
+
+
+def iter_items(
+    stream: IO[str], chunk_size: int = CHUNK_SIZE
+) -> Iterator[Tuple[str, object]]:
+    """Yields the key/value pairs of a JSON object as they are decoded.
+
+    Args:
+        stream: A text stream containing a single JSON object.
+        chunk_size: The number of characters read at a time.
+
+    Raises:
+        ValueError: If the document is not a JSON object, or if anything
+        but whitespace follows it.
+    """
+    reader = _Reader(stream, chunk_size)
+    reader.expect("{")
+    reader.skip_whitespace()
+    if reader.buffer[reader.position:reader.position + 1] == "}":
+        reader.position += 1
+        reader.expect_end()
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a string key but found {key!r}.")
+        reader.expect(":")
+        yield key, reader.value()
+        if reader.expect(",", "}") == "}":
+            reader.expect_end()
+            return
+
+
+def replace_values_streaming(
+    mapping: MutableMapping,
+    stream: IO[str],
+    batch_size: int = BATCH_SIZE,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Replace the values of mapping with the values of a JSON document,
+    reading the document incrementally.
+
+    Pairs are applied in batches with mapping.update(). If a batch is
+    rejected (e.g. a StrictMapping given a null value), the earlier batches
+    stay applied and the error is raised.
+
+    Args:
+        mapping: A mutable mapping.
+        stream: A text stream containing a single JSON object.
+        batch_size: The number of pairs applied per update().
+        chunk_size: The number of characters read at a time.
+
+    Returns:
+        The number of keys replaced.
+    """
+    batch: Dict[str, object] = {}
+    replaced = 0
+    for key, value in iter_items(stream, chunk_size):
+        batch[key] = value
+        if len(batch) >= batch_size:
+            mapping.update(batch)
+            replaced += len(batch)
+            batch = {}
+    if batch:
+        mapping.update(batch)
+        replaced += len(batch)
+    logger.info("replaced %d keys", replaced)
+    return replaced
+
+
+if __name__ == "__main__":
+    import io
+
+    from liskov_substitution import StrictMapping
+
+    logging.basicConfig(level=logging.INFO)
+
+    document = json.dumps({f"key{index}": index for index in range(100_000)})
+    strict_mapping = StrictMapping()
+    replace_values_streaming(strict_mapping, io.StringIO(document))
+    assert strict_mapping["key99999"] == 99999
+
+    for trailing in ("{} x", '{"a": 1} garbage', '{"a": 1}}'):
+        try:
+            replace_values_streaming(strict_mapping, io.StringIO(trailing))
+        except ValueError:
+            continue
+        raise AssertionError(f"Accepted {trailing!r}")
@@ -0,0 +1,95 @@
+# strict_mapping_benchmark.py
+# !/usr/bin/env python3
+"""Benchmarks the StrictMapping overrides against the MutableMapping mixins.
+
+Each method is timed twice on the same data: once through the override on
+StrictMapping and once through the pure-Python mixin inherited from
+MutableMapping (called explicitly, e.g. MutableMapping.update(mapping, ...)).
+
+Usage: python strict_mapping_benchmark.py
+"""
+
+
+import timeit
+from collections.abc import Mapping, MutableMapping
+from typing import Callable, Dict, Final, Tuple
+
+from liskov_substitution import StrictMapping
+
+SIZE: Final[int] = 100_000
+NUMBER: Final[int] = 20
+
+DATA: Final[Dict[str, int]] = {f"key{index}": index for index in range(SIZE)}
+PRESENT: Final[str] = "key1"
+
+
+def _filled() -> StrictMapping:
+    mapping = StrictMapping()
+    mapping.mapping.update(DATA)
+    return mapping
+
+
+# name -> (override, mixin). Each callable gets a filled mapping.
+CASES: Final[Dict[str, Tuple[Callable, Callable]]] = {
+    "update": (
+        lambda m: m.update(DATA),
+        lambda m: MutableMapping.update(m, DATA),
+    ),
+    "setdefault": (
+        lambda m: [m.setdefault(key, 0) for key in DATA],
+        lambda m: [MutableMapping.setdefault(m, key, 0) for key in DATA],
+    ),
+    "pop": (
+        lambda m: [m.pop(key) for key in DATA],
+        lambda m: [MutableMapping.pop(m, key) for key in DATA],
+    ),
+    "items": (
+        lambda m: list(m.items()),
+        lambda m: list(Mapping.items(m)),
+    ),
+    "values": (
+        lambda m: list(m.values()),
+        lambda m: list(Mapping.values(m)),
+    ),
+    "__contains__": (
+        lambda m: [key in m for key in DATA],
+        lambda m: [Mapping.__contains__(m, key) for key in DATA],
+    ),
+    "get": (
+        lambda m: [m.get(key) for key in DATA],
+        lambda m: [Mapping.get(m, key) for key in DATA],
+    ),
+    "clear": (
+        lambda m: m.clear(),
+        lambda m: MutableMapping.clear(m),
+    ),
+}
+
+
+def measure(operation: Callable) -> float:
+    """Returns the best time of one operation on a freshly filled mapping."""
+    return min(
+        timeit.repeat(
+            "operation(mapping)",
+            setup="mapping = filled()",
+            globals={"operation": operation, "filled": _filled},
+            number=1,
+            repeat=NUMBER,
+        )
+    )
+
+
+if __name__ == "__main__":
+    print(f"{SIZE} keys, best of {NUMBER}")
+    print(f"{'method':<14} {'override':>12} {'mixin':>12} {'speedup':>9}")
+    for name, (override, mixin) in CASES.items():
+        fast, slow = measure(override), measure(mixin)
+        print(
+            f"{name:<14} {fast * 1000:>10.2f}ms {slow * 1000:>10.2f}ms "
+            f"{slow / fast:>8.1f}x"
+        )
+
+    # The mixin answers True for a missing key because __getitem__ returns
+    # None rather than raising KeyError
+    assert "missing" not in _filled()
+    assert Mapping.__contains__(_filled(), "missing")
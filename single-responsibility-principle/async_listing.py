@@ -0,0 +1,169 @@
+# async_listing.py
+# !/usr/bin/env python3
+"""Asynchronous directory listing for high-latency filesystems.
+
+On network and FUSE mounts, readdir() and stat() can each block for
+milliseconds. The scan is run on a bounded thread pool in batches, and the
+entries are handed back to the event loop as an async iterator. Many
+directories can be listed concurrently, so the total time approaches the
+time of the slowest directory rather than the sum of all of them.
+"""
+
+
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import (
+    AsyncIterator,
+    Dict,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+from filters import Filter
+from scan import Entry, scan
+
+BATCH_SIZE: Final[int] = 256
+MAX_WORKERS: Final[int] = 32
+
+_default_executor: Optional[Executor] = None
+
+
+def _executor() -> Executor:
+    """Returns the shared executor used when none is given."""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    return _default_executor
+
+
+def _next_batch(
+    entries: Iterator[Entry], size: int, cancelled: threading.Event
+) -> List[Entry]:
+    """Returns up to size entries. Runs on a worker thread.
+
+    Stops early once the listing is cancelled, so an abandoned scan does
+    not keep running filters and stat calls.
+    """
+    batch: List[Entry] = []
+    while len(batch) < size and not cancelled.is_set():
+        entry = next(entries, None)
+        if entry is None:
+            break
+        batch.append(entry)
+    return batch
+
+
+async def alist(
+    path: str,
+    *filters: Filter,
+    executor: Optional[Executor] = None,
+    batch_size: int = BATCH_SIZE,
+) -> AsyncIterator[Entry]:
+    """Yields the entries of the path without blocking the event loop.
+
+    Readdir and stat calls run on the executor in batches of batch_size, so
+    the event loop is only involved once per batch. Cancelling the consumer
+    (or closing the iterator) stops the batch in flight after its current
+    entry and closes the directory on the executor.
+
+    Args:
+        path: The directory to list.
+        filters: The filters to apply during the scan.
+        executor: The executor for blocking calls, a shared thread pool of
+        MAX_WORKERS threads when omitted.
+        batch_size: The number of entries read per executor call.
+    """
+    executor = executor or _executor()
+    cancelled = threading.Event()
+    # Runs before the other filters, so once the listing is cancelled the
+    # entries a batch is still reading are rejected without being filtered
+    # or statted
+    gate = Filter(test=lambda _: not cancelled.is_set())
+    entries = scan(path, gate, *filters)
+    pending: Optional[Future] = None
+    try:
+        while True:
+            pending = executor.submit(
+                _next_batch, entries, batch_size, cancelled
+            )
+            batch = await asyncio.wrap_future(pending)
+            for entry in batch:
+                yield entry
+            if len(batch) < batch_size:
+                return
+    finally:
+        cancelled.set()
+        # On cancellation a batch may still be running on a worker thread.
+        # The scan is closed once that batch is done (or right away when it
+        # already is), so the directory handle is never closed under it.
+        if pending is None:
+            entries.close()
+        else:
+            pending.add_done_callback(lambda _: entries.close())
+
+
+async def _collect(
+    path: str, filters: Iterable[Filter], executor: Executor
+) -> List[Entry]:
+    """Returns all entries of the path."""
+    return [entry async for entry in alist(path, *filters, executor=executor)]
+
+
+async def list_many(
+    paths: Iterable[str],
+    *filters: Filter,
+    timeout: Optional[float] = None,
+    max_workers: int = MAX_WORKERS,
+) -> Dict[str, Union[List[Entry], BaseException]]:
+    """Lists many directories concurrently.
+
+    Every directory gets its own timeout. A directory that fails or times
+    out is reported with its exception instead of failing the whole call.
+    The call returns without waiting for the worker threads of listings
+    that timed out; they stop after the entry they are working on.
+
+    Args:
+        paths: The directories to list.
+        filters: The filters to apply during each scan.
+        timeout: The time limit per directory, in seconds.
+        max_workers: The maximum number of blocking calls in flight.
+
+    Returns:
+        The entries of each path, or the exception raised while listing it.
+    """
+    paths = list(paths)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(_collect(path, filters, executor), timeout)
+                for path in paths
+            ),
+            return_exceptions=True,
+        )
+    finally:
+        # Not a with block: shutdown(wait=True) would block the event loop
+        # until the batches of timed-out listings finish
+        executor.shutdown(wait=False, cancel_futures=True)
+    return dict(zip(paths, results))
+
+
+if __name__ == "__main__":
+
+    async def main() -> None:
+        async for entry in alist("../"):
+            print(entry.name)
+
+        listings = await list_many(["../", ".", "/does/not/exist"], timeout=5)
+        for path, listing in listings.items():
+            if isinstance(listing, BaseException):
+                print(f"{path}: {listing!r}")
+            else:
+                print(f"{path}: {len(listing)} entries")
+
+    asyncio.run(main())
@@ -0,0 +1,183 @@
+# disk_usage.py
+# !/usr/bin/env python3
+"""Disk usage aggregation over the entries of a listing.
+
+Every directory is read by a pool of worker threads, and each subdirectory
+is queued as soon as it is found, so the work is spread over the workers
+however the tree is shaped: a single deep subtree is read as concurrently
+as many shallow ones (os.scandir() and stat() release the GIL). Files with
+more than one hard link are counted once per (device, inode) across all
+subtrees. Totals are streamed as each subtree finishes, and running totals
+as each directory in it is counted, when asked for.
+
+The top-level entries come from the listing's own scan, so their stat data
+is reused and top-level files are never statted twice.
+"""
+
+
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Dict,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Set,
+    Tuple,
+)
+
+from scan import Entry
+
+MAX_WORKERS: Final[int] = 8
+BLOCK_SIZE: Final[int] = 512  # The unit of st_blocks
+
+
+class Usage(NamedTuple):
+    """The recursive totals of an entry.
+
+    Attributes:
+        bytes: The number of bytes used.
+        files: The number of non-directory entries.
+    """
+
+    bytes: int
+    files: int
+
+
+class _HardLinks:
+    """The set of hard-linked inodes already counted, shared by workers."""
+
+    def __init__(self) -> None:
+        self._seen: Set[Tuple[int, int]] = set()
+        self._lock = threading.Lock()
+
+    def first_sighting(self, device: int, inode: int) -> bool:
+        """Returns True the first time an inode is seen."""
+        key = (device, inode)
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+
+
+def _size(size: int, blocks: int, apparent: bool) -> int:
+    """Returns the apparent size or, where known, the allocated size."""
+    if apparent or not blocks:
+        return size
+    return blocks * BLOCK_SIZE
+
+
+def _count(
+    path: str, hard_links: _HardLinks, apparent: bool
+) -> Tuple[Usage, List[str]]:
+    """Returns the totals of the entries of one directory, without following
+    symlinks, and the paths of its subdirectories."""
+    total_bytes = total_files = 0
+    subdirectories: List[str] = []
+    try:
+        dir_entries = os.scandir(path)
+    except OSError:
+        # Unreadable or removed, as du reports and moves on
+        return Usage(bytes=0, files=0), subdirectories
+    with dir_entries:
+        for dir_entry in dir_entries:
+            try:
+                stat = dir_entry.stat(follow_symlinks=False)
+                is_dir = dir_entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.st_nlink > 1 and not is_dir:
+                if not hard_links.first_sighting(stat.st_dev, stat.st_ino):
+                    continue
+            total_bytes += _size(
+                stat.st_size, getattr(stat, "st_blocks", 0), apparent
+            )
+            if is_dir:
+                subdirectories.append(dir_entry.path)
+            else:
+                total_files += 1
+    return Usage(bytes=total_bytes, files=total_files), subdirectories
+
+
+def disk_usage(
+    entries: Iterable[Entry],
+    max_workers: int = MAX_WORKERS,
+    apparent: bool = True,
+    partial: bool = False,
+) -> Iterator[Tuple[Entry, Usage]]:
+    """Yields the recursive totals of each entry as soon as it is known.
+
+    Files are yielded first, from their scanned stat data. Directories are
+    yielded in the order their subtrees finish.
+
+    Args:
+        entries: The entries of a listing, from scan(..., stat=True).
+        max_workers: The number of directories read concurrently.
+        apparent: Count apparent sizes (st_size) rather than allocated
+        blocks.
+        partial: Also yield the running totals of a directory each time
+        one of the directories under it is counted. The last totals
+        yielded for an entry are its final ones.
+    """
+    hard_links = _HardLinks()
+    done: "queue.SimpleQueue[Future]" = queue.SimpleQueue()
+    owners: Dict[Future, Entry] = {}  # Directory read -> top-level entry
+    totals: Dict[Entry, Usage] = {}
+    unfinished: Dict[Entry, int] = {}  # Directory reads per entry
+
+    def submit(path: str, entry: Entry) -> None:
+        future = executor.submit(_count, path, hard_links, apparent)
+        owners[future] = entry
+        future.add_done_callback(done.put)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for entry in entries:
+            if entry.is_dir:
+                # The directory itself takes up space too
+                size = _size(entry.size, entry.blocks, apparent)
+                totals[entry] = Usage(bytes=size, files=0)
+                unfinished[entry] = 1
+                submit(entry.path, entry)
+                continue
+            if entry.nlink > 1:
+                if not hard_links.first_sighting(entry.device, entry.inode):
+                    yield entry, Usage(bytes=0, files=0)
+                    continue
+            size = _size(entry.size, entry.blocks, apparent)
+            yield entry, Usage(bytes=size, files=1)
+
+        while owners:
+            future = done.get()
+            entry = owners.pop(future)
+            counted, subdirectories = future.result()
+            # Each subdirectory is read as soon as it is found, so one deep
+            # subtree is spread over every worker
+            for path in subdirectories:
+                submit(path, entry)
+            unfinished[entry] += len(subdirectories) - 1
+            usage = totals[entry] = Usage(
+                bytes=totals[entry].bytes + counted.bytes,
+                files=totals[entry].files + counted.files,
+            )
+            if partial or not unfinished[entry]:
+                yield entry, usage
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    from scan import scan
+
+    grand_total = Usage(bytes=0, files=0)
+    for entry, usage in disk_usage(scan("../", stat=True)):
+        print(f"{usage.bytes:>12} {usage.files:>8} {entry.name}")
+        grand_total = Usage(
+            grand_total.bytes + usage.bytes, grand_total.files + usage.files
+        )
+    print(f"{grand_total.bytes:>12} {grand_total.files:>8} total")
@@ -0,0 +1,102 @@
+# filters.py
+# !/usr/bin/env python3
+"""Filter predicates that are pushed down into the scan.
+
+Filters test the raw os.DirEntry before an Entry is built, so rejected
+entries are never statted (when avoidable), materialized, sorted or
+formatted. Filters that only need the name or the file type are run before
+filters that need stat data.
+"""
+
+
+import fnmatch
+import os
+import re
+import time
+from typing import Callable, Final, NamedTuple, Optional
+
+FILE: Final[str] = "f"
+DIRECTORY: Final[str] = "d"
+SYMLINK: Final[str] = "l"
+
+
+class Filter(NamedTuple):
+    """A predicate over a directory entry.
+
+    Attributes:
+        test: Returns True when the entry should be kept.
+        needs_stat: Whether the test reads stat data. Such filters run last.
+    """
+
+    test: Callable[[os.DirEntry], bool]
+    needs_stat: bool = False
+
+
+def glob(pattern: str) -> Filter:
+    """Keeps entries whose name matches the shell-style pattern.
+
+    The pattern is compiled once, when the filter is created.
+    """
+    match = re.compile(fnmatch.translate(pattern)).match
+    return Filter(test=lambda dir_entry: match(dir_entry.name) is not None)
+
+
+def regex(pattern: str, flags: int = 0) -> Filter:
+    """Keeps entries whose name contains a match of the regular expression."""
+    search = re.compile(pattern, flags).search
+    return Filter(test=lambda dir_entry: search(dir_entry.name) is not None)
+
+
+def file_type(kind: str) -> Filter:
+    """Keeps entries of a type: FILE, DIRECTORY or SYMLINK.
+
+    The type is read from readdir() where the filesystem reports it, so no
+    stat call is needed on most filesystems.
+    """
+    tests = {
+        FILE: lambda dir_entry: dir_entry.is_file(follow_symlinks=False),
+        DIRECTORY: lambda dir_entry: dir_entry.is_dir(follow_symlinks=False),
+        SYMLINK: lambda dir_entry: dir_entry.is_symlink(),
+    }
+    if kind not in tests:
+        raise ValueError(f"Unknown file type: {kind!r}")
+    return Filter(test=tests[kind])
+
+
+def size_range(
+    minimum: Optional[int] = None, maximum: Optional[int] = None
+) -> Filter:
+    """Keeps entries whose size in bytes is within the range (inclusive)."""
+    low = 0 if minimum is None else minimum
+    high = float("inf") if maximum is None else maximum
+
+    def test(dir_entry: os.DirEntry) -> bool:
+        return low <= dir_entry.stat(follow_symlinks=False).st_size <= high
+
+    return Filter(test=test, needs_stat=True)
+
+
+def age_range(
+    minimum: Optional[float] = None,
+    maximum: Optional[float] = None,
+    now: Optional[float] = None,
+) -> Filter:
+    """Keeps entries last modified within the age range in seconds.
+
+    Args:
+        minimum: The minimum age (inclusive).
+        maximum: The maximum age (inclusive).
+        now: The reference time, the time of creation when omitted.
+    """
+    reference_ns = int((time.time() if now is None else now) * 1e9)
+    # Compare against mtime bounds so each test is a single comparison
+    newest = reference_ns - int((minimum or 0) * 1e9)
+    oldest = float("-inf") if maximum is None else (
+        reference_ns - int(maximum * 1e9)
+    )
+
+    def test(dir_entry: os.DirEntry) -> bool:
+        mtime_ns = dir_entry.stat(follow_symlinks=False).st_mtime_ns
+        return oldest <= mtime_ns <= newest
+
+    return Filter(test=test, needs_stat=True)
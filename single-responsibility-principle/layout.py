@@ -0,0 +1,191 @@
+# layout.py
+# !/usr/bin/env python3
+"""Column layout and rendering of directory entries.
+
+The layout is chosen the way ls(1) chooses it: entries are placed in
+column-major order and every candidate number of columns is tried at once
+in a single pass over the entry widths. The candidate with the most columns
+that still fits the line width wins, and each column is only as wide as its
+widest entry.
+
+The rendered output is built in one buffer and written with a single call.
+When the output is not a terminal, the layout is skipped entirely.
+"""
+
+
+import json
+import shutil
+import sys
+from typing import Final, List, NamedTuple, Optional, Sequence, TextIO
+
+COLUMN_GAP: Final[int] = 2
+
+COLUMNS: Final[str] = "columns"
+LINES: Final[str] = "lines"
+NUL: Final[str] = "nul"
+JSON_LINES: Final[str] = "json"
+
+
+class Layout(NamedTuple):
+    """The shape of a column layout.
+
+    Attributes:
+        rows: The number of rows.
+        widths: The width of each column, including the column gap.
+    """
+
+    rows: int
+    widths: List[int]
+
+
+def column_layout(
+    lengths: Sequence[int], line_width: int, gap: int = COLUMN_GAP
+) -> Layout:
+    """Returns the layout with the most columns that fits the line width.
+
+    Every candidate layout is evaluated in the same pass over the entries,
+    so the cost is O(n * c) where c is the number of candidates. No column
+    is narrower than the shortest entry, which bounds the column count, and
+    column counts that round up to the same row count are the same layout,
+    so each row count is a candidate once.
+
+    Args:
+        lengths: The display width of each entry, in display order.
+        line_width: The width of the output line.
+        gap: The number of spaces between columns.
+    """
+    count = len(lengths)
+    if count == 0:
+        return Layout(rows=0, widths=[])
+
+    narrowest = max(min(lengths) + gap, 1)
+    max_cols = max(1, min(count, (line_width + gap) // narrowest))
+    # Fewest rows (most columns) first
+    row_counts = sorted({-(-count // cols) for cols in range(1, max_cols + 1)})
+    # candidates[k] holds the column widths when using row_counts[k] rows
+    candidates = [[0] * -(-count // rows) for rows in row_counts]
+    line_lengths = [0] * len(row_counts)
+    valid = [True] * len(row_counts)
+
+    for index, length in enumerate(lengths):
+        for k, rows in enumerate(row_counts):
+            if not valid[k]:
+                continue
+            widths = candidates[k]
+            column = index // rows
+            # The last column does not need a trailing gap
+            needed = length + (gap if column != len(widths) - 1 else 0)
+            if needed > widths[column]:
+                line_lengths[k] += needed - widths[column]
+                widths[column] = needed
+                if line_lengths[k] > line_width:
+                    valid[k] = False
+
+    for k, rows in enumerate(row_counts):
+        if valid[k]:
+            return Layout(rows=rows, widths=candidates[k])
+    # A single column is used even when an entry is wider than the line
+    return Layout(rows=count, widths=[max(lengths)])
+
+
+def render_columns(
+    entries: Sequence[str], line_width: int, gap: int = COLUMN_GAP
+) -> str:
+    """Returns the entries rendered in columns as a single string.
+
+    Args:
+        entries: The entries to render, already in display order.
+        line_width: The width of the output line.
+        gap: The number of spaces between columns.
+    """
+    layout = column_layout([len(entry) for entry in entries], line_width, gap)
+    last = len(layout.widths) - 1
+    lines = []
+    for row in range(layout.rows):
+        cells = []
+        for column, width in enumerate(layout.widths):
+            index = column * layout.rows + row
+            if index >= len(entries):
+                break
+            entry = entries[index]
+            cells.append(entry if column == last else f"{entry:<{width}}")
+        lines.append("".join(cells).rstrip())
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def render(
+    entries: Sequence[str],
+    mode: str = COLUMNS,
+    line_width: Optional[int] = None,
+) -> str:
+    """Returns the entries rendered in the requested output mode.
+
+    Args:
+        entries: The entries to render, already in display order.
+        mode: One of COLUMNS, LINES, NUL or JSON_LINES.
+        line_width: The width of the output line. Only used by COLUMNS and
+        queried from the terminal when omitted.
+    """
+    if mode == COLUMNS:
+        if line_width is None:
+            line_width = shutil.get_terminal_size().columns
+        return render_columns(entries, line_width)
+    if mode == LINES:
+        return "".join(f"{entry}\n" for entry in entries)
+    if mode == NUL:
+        return "".join(f"{entry}\0" for entry in entries)
+    if mode == JSON_LINES:
+        return "".join(f"{json.dumps(entry)}\n" for entry in entries)
+    raise ValueError(f"Unknown output mode: {mode!r}")
+
+
+def output_mode(stream: TextIO) -> str:
+    """Returns COLUMNS for a terminal and LINES for anything else."""
+    isatty = getattr(stream, "isatty", None)
+    return COLUMNS if isatty is not None and isatty() else LINES
+
+
+def write_entries(
+    entries: Sequence[str],
+    stream: Optional[TextIO] = None,
+    mode: Optional[str] = None,
+) -> None:
+    """Writes the rendered entries to the stream with a single write.
+
+    Args:
+        entries: The entries to write, already in display order.
+        stream: The stream to write to, standard out by default.
+        mode: The output mode. Detected from the stream when omitted.
+    """
+    stream = stream or sys.stdout
+    stream.write(render(entries, mode or output_mode(stream)))
+
+
+if __name__ == "__main__":
+    import random
+
+    def exhaustive_layout(lengths: Sequence[int], line_width: int) -> Layout:
+        """Tries every column count from the most down, one at a time."""
+        count = len(lengths)
+        for cols in range(count, 0, -1):
+            rows = -(-count // cols)
+            widths = [
+                max(lengths[start:start + rows]) + COLUMN_GAP
+                for start in range(0, count, rows)
+            ]
+            widths[-1] -= COLUMN_GAP
+            if sum(widths) <= line_width or cols == 1:
+                return Layout(rows=rows, widths=widths)
+        return Layout(rows=0, widths=[])
+
+    assert column_layout(
+        [8, 2, 3, 5, 2, 20, 8, 3, 40, 40, 8], 108
+    ) == exhaustive_layout([8, 2, 3, 5, 2, 20, 8, 3, 40, 40, 8], 108)
+    rng = random.Random(0)
+    for _ in range(5_000):
+        lengths = [rng.randint(1, 40) for _ in range(rng.randint(0, 60))]
+        line_width = rng.randint(1, 200)
+        assert column_layout(lengths, line_width) == exhaustive_layout(
+            lengths, line_width
+        ), (lengths, line_width)
+    print(render_columns(sorted(dir(__builtins__)), 80), end="")
@@ -0,0 +1,284 @@
+# listing_benchmark.py
+# !/usr/bin/env python3
+"""Benchmarks the directory listing implementations.
+
+Synthetic directories of increasing size are generated on each filesystem
+root (a disk-backed temporary directory and, where present, tmpfs at
+/dev/shm). Every implementation lists every directory with its output sent
+to /dev/null, which claims to be a terminal so that column layouts are
+rendered. The following is reported:
+
+- wall: the best wall time over the repeats, measured without counting
+- reads: the directories read, through os.scandir() or os.listdir()
+- stats: the stat calls, through os.stat(), os.lstat() or the first
+DirEntry.stat() of an entry (DirEntry caches the result)
+- writes: the write calls that reached the output file
+- peak: the peak memory allocated by Python while listing, from tracemalloc
+in one extra run
+
+The calls are counted by wrapping the os functions for one extra run, so
+they are exact for this code on every platform. A directory read is one
+call here however many getdents() calls the kernel needs for it, and a
+DirEntry.is_dir() that falls back to stat (on filesystems that do not
+report the file type) is not counted; run under `strace -c -f` to see the
+syscalls themselves.
+
+Usage: python listing_benchmark.py --sizes 10 1000 100000
+"""
+
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Final,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+import layout
+import srp_solution_1
+from ordering import sort_entries
+from scan import scan
+from single_responsibility_principle import ListDir
+
+SIZES: Final[List[int]] = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+TMPFS: Final[str] = "/dev/shm"
+REPEATS: Final[int] = 3
+LINE_WIDTH: Final[int] = 120
+
+
+class Result(NamedTuple):
+    """The measurements of one implementation on one directory."""
+
+    wall: float
+    reads: int
+    stats: int
+    writes: int
+    peak: int
+
+
+class _Counts:
+    """The calls that reach the filesystem, counted by the wrappers."""
+
+    def __init__(self) -> None:
+        self.reads = 0
+        self.stats = 0
+        self.writes = 0
+
+
+class _NullWriter(io.RawIOBase):
+    """A raw stream that discards its data and counts the write calls."""
+
+    def __init__(self, counts: _Counts) -> None:
+        super().__init__()
+        self._counts = counts
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._counts.writes += 1
+        return len(data)
+
+
+class _NullTerminal(io.TextIOWrapper):
+    """A text stream that discards its output and reports itself as a
+    terminal."""
+
+    def isatty(self) -> bool:
+        return True
+
+
+class _CountingDirEntry:
+    """A DirEntry that counts the first stat() of each kind."""
+
+    def __init__(self, dir_entry: os.DirEntry, counts: _Counts) -> None:
+        self._dir_entry = dir_entry
+        self._counts = counts
+        self._statted: set = set()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._dir_entry, name)
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        if follow_symlinks not in self._statted:
+            self._statted.add(follow_symlinks)
+            self._counts.stats += 1
+        return self._dir_entry.stat(follow_symlinks=follow_symlinks)
+
+
+class _CountingScandir:
+    """A scandir iterator whose entries count their stat calls."""
+
+    def __init__(self, iterator: Any, counts: _Counts) -> None:
+        self._iterator = iterator
+        self._counts = counts
+
+    def __iter__(self) -> Iterator[_CountingDirEntry]:
+        for dir_entry in self._iterator:
+            yield _CountingDirEntry(dir_entry, self._counts)
+
+    def __enter__(self) -> "_CountingScandir":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._iterator.close()
+
+
+@contextlib.contextmanager
+def _counting(counts: _Counts) -> Iterator[None]:
+    """Counts directory reads and stat calls through the os module."""
+    originals = {
+        name: getattr(os, name)
+        for name in ("scandir", "listdir", "stat", "lstat")
+    }
+
+    def scandir(*args: Any, **kwargs: Any) -> _CountingScandir:
+        counts.reads += 1
+        return _CountingScandir(originals["scandir"](*args, **kwargs), counts)
+
+    def listdir(*args: Any, **kwargs: Any) -> List[str]:
+        counts.reads += 1
+        return originals["listdir"](*args, **kwargs)
+
+    def stat(*args: Any, **kwargs: Any) -> os.stat_result:
+        counts.stats += 1
+        return originals["stat"](*args, **kwargs)
+
+    def lstat(*args: Any, **kwargs: Any) -> os.stat_result:
+        counts.stats += 1
+        return originals["lstat"](*args, **kwargs)
+
+    wrappers = {
+        "scandir": scandir,
+        "listdir": listdir,
+        "stat": stat,
+        "lstat": lstat,
+    }
+    for name, wrapper in wrappers.items():
+        setattr(os, name, wrapper)
+    try:
+        yield
+    finally:
+        for name, original in originals.items():
+            setattr(os, name, original)
+
+
+def list_dir(path: str) -> None:
+    """ListDir.print"""
+    ListDir(path).print()
+
+
+def srp_pipeline(path: str) -> None:
+    """listdir -> sort_entries -> print_entries"""
+    entries = srp_solution_1.listdir(path)
+    srp_solution_1.print_entries(srp_solution_1.sort_entries(entries))
+
+
+def scan_pipeline(path: str) -> None:
+    """scan -> sort_entries -> write_entries"""
+    entries = sort_entries(scan(path))
+    sys.stdout.write(
+        layout.render([entry.name for entry in entries], line_width=LINE_WIDTH)
+    )
+
+
+IMPLEMENTATIONS: Final[Dict[str, Callable[[str], None]]] = {
+    "ListDir.print": list_dir,
+    "srp_solution_1": srp_pipeline,
+    "scan": scan_pipeline,
+}
+
+
+def generate(root: str, size: int) -> str:
+    """Returns a new directory with size empty files in it."""
+    path = tempfile.mkdtemp(prefix=f"listing-{size}-", dir=root)
+    for index in range(size):
+        os.close(os.open(os.path.join(path, f"file{index}.txt"), os.O_CREAT))
+    return path
+
+
+def measure(implementation: Callable[[str], None], path: str) -> Result:
+    """Returns the best of REPEATS runs of the implementation on path."""
+    walls = []
+    counts = _Counts()
+    null = _NullTerminal(io.BufferedWriter(_NullWriter(counts)))
+    with null, contextlib.redirect_stdout(null):
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            implementation(path)
+            null.flush()
+            walls.append(time.perf_counter() - start)
+
+        counts.writes = 0
+        with _counting(counts):
+            implementation(path)
+            null.flush()
+        writes = counts.writes
+
+        tracemalloc.start()
+        implementation(path)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return Result(
+        wall=min(walls),
+        reads=counts.reads,
+        stats=counts.stats,
+        writes=writes,
+        peak=peak,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Runs the benchmark and prints one row per measurement."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--roots", nargs="+", default=None)
+    args = parser.parse_args(argv)
+
+    roots = args.roots or [tempfile.gettempdir()]
+    if args.roots is None and os.path.isdir(TMPFS):
+        roots.append(TMPFS)
+
+    # Keep the ListDir layout away from the real terminal size
+    os.environ["COLUMNS"] = str(LINE_WIDTH)
+
+    print(
+        f"{'root':<12} {'entries':>9} {'implementation':<16} "
+        f"{'wall (ms)':>10} {'reads':>6} {'stats':>8} {'writes':>7} "
+        f"{'peak (KiB)':>11}"
+    )
+    for root in roots:
+        for size in args.sizes:
+            path = generate(root, size)
+            try:
+                for name, implementation in IMPLEMENTATIONS.items():
+                    result = measure(implementation, path)
+                    print(
+                        f"{root:<12} {size:>9} {name:<16} "
+                        f"{result.wall * 1000:>10.2f} {result.reads:>6} "
+                        f"{result.stats:>8} {result.writes:>7} "
+                        f"{result.peak / 1024:>11.1f}"
+                    )
+            finally:
+                shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
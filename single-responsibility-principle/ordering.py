@@ -0,0 +1,80 @@
+# ordering.py
+# !/usr/bin/env python3
+"""Pluggable orderings of directory entries.
+
+An ordering is a key function plus a direction. Keys are computed once per
+entry (list.sort() decorates, sorts and undecorates internally). Orderings
+that read stat data say so, so the scan can stat the entries up front; the
+name orderings need none, so a default listing issues no stat calls.
+
+Multi-key orderings are applied as successive stable sorts, from the least
+significant key to the most significant one. This lets every key have its
+own direction while still computing each key only once per entry.
+"""
+
+
+import re
+from typing import Any, Callable, Iterable, List, NamedTuple
+
+from scan import Entry
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+class Ordering(NamedTuple):
+    """A sort key and a direction.
+
+    Attributes:
+        key: Returns the sort key of an entry.
+        reverse: Whether to sort in descending order.
+        needs_stat: Whether the key reads stat data.
+    """
+
+    key: Callable[[Entry], Any]
+    reverse: bool = False
+    needs_stat: bool = False
+
+    def reversed(self) -> "Ordering":
+        """Returns the same ordering in the opposite direction."""
+        return self._replace(reverse=not self.reverse)
+
+
+def natural_key(name: str) -> List[Any]:
+    """Returns a key that orders embedded numbers by value.
+
+    Example: "file2" sorts before "file10".
+
+    re.split() with a capturing group always places text at even indices and
+    digits at odd indices, so keys only ever compare str with str and int
+    with int.
+    """
+    parts: List[Any] = _DIGITS.split(name.casefold())
+    for index in range(1, len(parts), 2):
+        parts[index] = int(parts[index])
+    return parts
+
+
+BY_NAME = Ordering(key=lambda entry: entry.name)
+BY_NAME_CASEFOLD = Ordering(key=lambda entry: entry.name.casefold())
+NATURAL = Ordering(key=lambda entry: natural_key(entry.name))
+BY_SIZE = Ordering(key=lambda entry: entry.size, reverse=True, needs_stat=True)
+BY_MTIME = Ordering(
+    key=lambda entry: entry.mtime_ns, reverse=True, needs_stat=True
+)
+DIRECTORIES_FIRST = Ordering(key=lambda entry: not entry.is_dir)
+
+
+def sort_entries(
+    entries: Iterable[Entry], *orderings: Ordering
+) -> List[Entry]:
+    """Returns the entries sorted by one or more orderings.
+
+    Earlier orderings take precedence; later ones break ties. Without any
+    ordering, entries are sorted by name.
+
+    Example: sort_entries(entries, DIRECTORIES_FIRST, BY_SIZE, BY_NAME)
+    """
+    result = list(entries)
+    for ordering in reversed(orderings or (BY_NAME,)):
+        result.sort(key=ordering.key, reverse=ordering.reverse)
+    return result
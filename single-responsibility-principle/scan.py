@@ -0,0 +1,216 @@
+# scan.py
+# !/usr/bin/env python3
+"""Scanning of directory entries.
+
+A scan reads a directory once with os.scandir(). The name and type of an
+entry come from the directory itself, so a plain listing issues no stat
+calls at all. Stat data (sizes, times, inodes) is read the first time it is
+needed, at most once per entry, and then carried on the Entry so that
+sorting and formatting never go back to the filesystem for it again.
+
+Filters are applied to the raw os.DirEntry during the scan, so only the
+entries that are kept are turned into Entry objects. Callers that will read
+stat data from every entry (a sort by size, a disk-usage pass) ask scan()
+to stat eagerly, so an entry removed in the meantime is skipped rather than
+failing later.
+"""
+
+
+import os
+import stat as stat_module
+from typing import Callable, Iterator, Optional
+
+from filters import Filter
+
+
+class Entry:
+    """A directory entry, with its stat data read on first use.
+
+    Attributes:
+        name: The entry name.
+        path: The entry path, joined with the scanned directory.
+        is_dir: Whether the entry is a directory (symlinks not followed).
+        is_symlink: Whether the entry is a symbolic link.
+        size: The size in bytes.
+        blocks: The number of 512-byte blocks allocated, 0 where unknown.
+        mtime_ns: The modification time in nanoseconds.
+        inode: The inode number.
+        device: The device number.
+        nlink: The number of hard links.
+    """
+
+    __slots__ = ("name", "path", "is_dir", "is_symlink", "_source", "_stat")
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        is_dir: bool,
+        is_symlink: bool,
+        source: Optional[os.DirEntry] = None,
+        stat: Optional[os.stat_result] = None,
+    ) -> None:
+        """Inits Entry with its name and type.
+
+        Args:
+            source: The DirEntry to stat when stat data is first needed.
+            stat: The stat data, when it is already known.
+        """
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.is_symlink = is_symlink
+        self._source = source
+        self._stat = stat
+
+    def stat(self) -> os.stat_result:
+        """Returns the stat data of the entry, issuing at most one stat call.
+
+        Raises:
+            FileNotFoundError: If the entry was removed since the scan.
+        """
+        if self._stat is None:
+            if self._source is not None:
+                # DirEntry caches the result, so no syscall is repeated
+                self._stat = self._source.stat(follow_symlinks=False)
+            else:
+                self._stat = os.stat(self.path, follow_symlinks=False)
+        return self._stat
+
+    @property
+    def size(self) -> int:
+        return self.stat().st_size
+
+    @property
+    def blocks(self) -> int:
+        return getattr(self.stat(), "st_blocks", 0)
+
+    @property
+    def mtime_ns(self) -> int:
+        return self.stat().st_mtime_ns
+
+    @property
+    def inode(self) -> int:
+        return self.stat().st_ino
+
+    @property
+    def device(self) -> int:
+        return self.stat().st_dev
+
+    @property
+    def nlink(self) -> int:
+        return self.stat().st_nlink
+
+    def __repr__(self) -> str:
+        return f"Entry(name={self.name!r}, path={self.path!r})"
+
+
+def to_entry(dir_entry: os.DirEntry) -> Entry:
+    """Returns an Entry from a DirEntry without issuing a stat call.
+
+    The type comes from the directory listing where the filesystem reports
+    it; DirEntry falls back to a stat of its own where it does not.
+    """
+    return Entry(
+        name=dir_entry.name,
+        path=dir_entry.path,
+        is_dir=dir_entry.is_dir(follow_symlinks=False),
+        is_symlink=dir_entry.is_symlink(),
+        source=dir_entry,
+    )
+
+
+class _StatDirEntry:
+    """The os.DirEntry interface of an Entry, for filters.
+
+    Answers from the stat data of the entry, so filters can be run on an
+    entry that did not come from a scan.
+    """
+
+    __slots__ = ("name", "path", "_entry")
+
+    def __init__(self, entry: Entry) -> None:
+        self.name = entry.name
+        self.path = entry.path
+        self._entry = entry
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        if follow_symlinks and self._entry.is_symlink:
+            return os.stat(self.path)
+        return self._entry.stat()
+
+    def _is_mode(self, test: Callable[[int], bool], follow: bool) -> bool:
+        try:
+            return test(self.stat(follow_symlinks=follow).st_mode)
+        except FileNotFoundError:
+            return False
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        return self._is_mode(stat_module.S_ISDIR, follow_symlinks)
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:
+        return self._is_mode(stat_module.S_ISREG, follow_symlinks)
+
+    def is_symlink(self) -> bool:
+        return self._entry.is_symlink
+
+    def inode(self) -> int:
+        return self._entry.inode
+
+
+def matches(entry: Entry, *filters: Filter) -> bool:
+    """Returns whether an entry passes all filters.
+
+    For entries that did not come from a scan, such as those returned by
+    stat_entry(); scan() applies its filters itself.
+
+    Raises:
+        FileNotFoundError: If a filter stats an entry that was removed.
+    """
+    dir_entry = _StatDirEntry(entry)
+    return all(f.test(dir_entry) for f in filters)  # type: ignore
+
+
+def stat_entry(directory: str, name: str) -> Entry:
+    """Returns the Entry of a single name in the directory with one stat.
+
+    Raises:
+        FileNotFoundError: If the name does not exist.
+    """
+    path = os.path.join(directory, name)
+    stat = os.stat(path, follow_symlinks=False)
+    return Entry(
+        name=name,
+        path=path,
+        is_dir=stat_module.S_ISDIR(stat.st_mode),
+        is_symlink=stat_module.S_ISLNK(stat.st_mode),
+        stat=stat,
+    )
+
+
+def scan(
+    path: str, *filters: Filter, stat: bool = False
+) -> Iterator[Entry]:
+    """Yields the entries of the path that pass all filters.
+
+    Args:
+        path: The directory to scan.
+        filters: The filters to apply. Filters that need no stat data run
+        first, so most rejections cost no syscall.
+        stat: Whether to stat each entry during the scan, for callers that
+        read stat data from every entry. Otherwise entries are statted
+        when their stat data is first read.
+    """
+    # sorted() is stable, so the caller's order is kept within each group
+    tests = [f.test for f in sorted(filters, key=lambda f: f.needs_stat)]
+    with os.scandir(path) as dir_entries:
+        for dir_entry in dir_entries:
+            try:
+                if all(test(dir_entry) for test in tests):
+                    entry = to_entry(dir_entry)
+                    if stat:
+                        entry.stat()
+                    yield entry
+            except FileNotFoundError:
+                # Removed between readdir and stat
+                continue
@@ -15,9 +15,20 @@ This example was inspired by Linux and the Unix Philosophy
 
 
 import os
-from typing import Final
-
-MAX_COLS: Final[int] = 3
+import sys
+
+import layout
+from disk_usage import disk_usage
+from filters import Filter, glob
+from ordering import (
+    BY_NAME,
+    DIRECTORIES_FIRST,
+    NATURAL,
+    Ordering,
+    sort_entries,
+)
+from scan import scan
+from watch import Watcher
 
 
 # ListDir has more than one reason to change (e.g. sorting predicate,
@@ -27,13 +38,16 @@ MAX_COLS: Final[int] = 3
 class ListDir:
     """Represents a command for listing entries of a directory."""
 
-    def __init__(self, path: str = None) -> None:
-        """Inits ListDir with a path.
+    def __init__(self, path: str = None, *orderings: Ordering) -> None:
+        """Inits ListDir with a path and optional orderings.
 
         Args:
             path: The path to list.
+            orderings: The sort orderings, by name when omitted.
         """
         self._path = path or os.getcwd()
+        self._orderings = orderings
+        self._filters: tuple = ()
 
     def set_path(self, path: str = None) -> None:
         """Sets the current path.
@@ -43,25 +57,76 @@ class ListDir:
         """
         self._path = path or os.getcwd()
 
+    def set_orderings(self, *orderings: Ordering) -> None:
+        """Sets the sort orderings.
+
+        Args:
+            orderings: The sort orderings, by name when omitted.
+        """
+        self._orderings = orderings
+
+    def set_filters(self, *filters: Filter) -> None:
+        """Sets the filters applied while scanning.
+
+        Args:
+            filters: The filters an entry must pass to be listed.
+        """
+        self._filters = filters
+
     def print(self) -> None:
         """Prints the entries of the current path to standard out.
 
-        The entries are sorted in ascending order and printed in a
-        column format.
+        The entries are sorted by the orderings and printed in a column
+        format when standard out is a terminal, or one per line otherwise.
+        """
+        needs_stat = any(ordering.needs_stat for ordering in self._orderings)
+        entries = sort_entries(
+            scan(self._path, *self._filters, stat=needs_stat),
+            *self._orderings,
+        )
+        layout.write_entries([entry.name for entry in entries], sys.stdout)
+
+    def print_disk_usage(self) -> None:
+        """Prints the recursive size and file count of each entry.
+
+        Lines are printed as soon as the totals of each entry are known.
         """
-        entries = sorted(os.listdir(self._path))
-        width = os.get_terminal_size().columns // MAX_COLS
+        entries = scan(self._path, *self._filters, stat=True)
+        for entry, usage in disk_usage(entries):
+            print(f"{usage.bytes:>12} {usage.files:>8} {entry.name}")
+
+    def watch(self, interval: float = 1.0) -> None:
+        """Prints the entries, then prints only what changes, forever.
 
-        column = 1
-        for entry in entries:
-            end_char = ""
-            if column == MAX_COLS:
-                end_char, column = "\n", 0
-            print(f"{entry:<{width}}", end=end_char)
-            column += 1
-        print(end="\n")
+        Args:
+            interval: The time between checks for changes, in seconds.
+        """
+        watcher = Watcher(
+            self._path,
+            *self._filters,
+            orderings=self._orderings or (BY_NAME,),
+        )
+        try:
+            entries = watcher.entries()
+            layout.write_entries([entry.name for entry in entries])
+            for changes in watcher.watch(interval):
+                lines = [f"+ {entry.name}" for entry in changes.added]
+                lines += [f"- {entry.name}" for entry in changes.removed]
+                lines += [f"~ {entry.name}" for entry in changes.changed]
+                layout.write_entries(lines, mode=layout.LINES)
+        finally:
+            watcher.close()
 
 
 if __name__ == "__main__":
     ls = ListDir("../")
     ls.print()
+
+    ls.set_orderings(DIRECTORIES_FIRST, NATURAL)
+    ls.print()
+
+    ls.set_filters(glob("*.py"))
+    ls.print()
+
+    ls.set_filters()
+    ls.print_disk_usage()
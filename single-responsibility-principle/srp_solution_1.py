@@ -8,9 +8,11 @@ The functions use simple APIs and can be composed to achieve a larger goal.
 
 
 import os
-from typing import Any, Final, Generator, Tuple
+import shutil
+from typing import Any, Generator, Optional, TextIO, Tuple
+
+import layout
 
-MAX_COLS: Final[int] = 3
 LazyEntries = Generator[Tuple[str, str], Any, Any]
 
 
@@ -28,25 +30,40 @@ def sort_entries(entries: str, seperator=" ") -> str:
 
 
 # No side-effects
-def entries_in_column_format(entries: str, seperator=" ") -> LazyEntries:
-    """Yields entries in a column format."""
-    width = os.get_terminal_size().columns // MAX_COLS
+def entries_in_column_format(
+    entries: str, seperator=" ", line_width: Optional[int] = None
+) -> LazyEntries:
+    """Yields entries in a column format.
 
-    column = 1
-    for entry in entries.split(seperator):
-        end_char = ""
-        if column == MAX_COLS:
-            end_char, column = "\n", 0
-        yield f"{entry:<{width}}", end_char
-        column += 1
+    The line width is queried from the terminal once when omitted.
+    """
+    if line_width is None:
+        line_width = shutil.get_terminal_size().columns
+    names = entries.split(seperator)
+    shape = layout.column_layout([len(name) for name in names], line_width)
+
+    last = len(shape.widths) - 1
+    for row in range(shape.rows):
+        for column, width in enumerate(shape.widths):
+            index = column * shape.rows + row
+            if index >= len(names):
+                yield "", "\n"
+                break
+            if column == last:
+                yield names[index], "\n"
+            else:
+                yield f"{names[index]:<{width}}", ""
 
 
 # Isolate side-effects (IO)
-def print_entries(entries: str, seperator=" ") -> None:
-    """Print entries to standard out."""
-    for entry, end_char in entries_in_column_format(entries, seperator):
-        print(entry, end=end_char)
-    print(end="\n")
+def print_entries(
+    entries: str,
+    seperator=" ",
+    stream: Optional[TextIO] = None,
+    mode: Optional[str] = None,
+) -> None:
+    """Print entries to standard out (or stream) with a single write."""
+    layout.write_entries(entries.split(seperator), stream, mode)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,317 @@
+# watch.py
+# !/usr/bin/env python3
+"""Watching a directory for changes between listings.
+
+A Watcher keeps a snapshot of the previous scan (each entry with its size
+and mtime) and the entries in sorted order, by every ordering of the
+listing with ties broken by name. Each refresh reports only the entries
+that were added, removed or changed, and updates the sorted order with
+binary search instead of re-sorting everything.
+
+On Linux, inotify reports which names changed, so a refresh only stats
+those names. Elsewhere (or when inotify is unavailable or its queue
+overflows), the directory is re-scanned and compared with the snapshot.
+The re-scan still stats every entry, but nothing is sorted or redrawn
+unless it changed.
+"""
+
+
+import bisect
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import struct
+import time
+from typing import (
+    Any,
+    Dict,
+    Final,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+)
+
+from filters import Filter
+from ordering import BY_NAME, Ordering
+from scan import Entry, matches, scan, stat_entry
+
+POLL_INTERVAL: Final[float] = 1.0
+
+# From <sys/inotify.h>
+_IN_MODIFY: Final[int] = 0x002
+_IN_ATTRIB: Final[int] = 0x004
+_IN_CLOSE_WRITE: Final[int] = 0x008
+_IN_MOVED_FROM: Final[int] = 0x040
+_IN_MOVED_TO: Final[int] = 0x080
+_IN_CREATE: Final[int] = 0x100
+_IN_DELETE: Final[int] = 0x200
+_IN_Q_OVERFLOW: Final[int] = 0x4000
+_IN_MASK: Final[int] = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_IN_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+_IN_BUFFER_SIZE: Final[int] = 64 * 1024
+
+
+class Changes(NamedTuple):
+    """The differences between two listings.
+
+    Attributes:
+        added: The entries that are new.
+        removed: The entries that are gone, as they were last seen.
+        changed: The entries whose size or mtime changed.
+    """
+
+    added: List[Entry]
+    removed: List[Entry]
+    changed: List[Entry]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+@functools.total_ordering
+class _Descending:
+    """A sort key that compares in reverse, for descending orderings."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: Any) -> None:
+        self.key = key
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.key == other.key
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.key < self.key
+
+
+def _fingerprint(entry: Entry) -> tuple:
+    """Returns what must differ for an entry to count as changed."""
+    return entry.size, entry.mtime_ns, entry.is_dir
+
+
+class _Inotify:
+    """The names changed in a directory, as reported by inotify."""
+
+    def __init__(self, path: str) -> None:
+        """Starts watching the path.
+
+        Raises:
+            OSError: If inotify is not available.
+        """
+        name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        watch = libc.inotify_add_watch(self._fd, os.fsencode(path), _IN_MASK)
+        if watch < 0:
+            os.close(self._fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def changed_names(self, timeout: float) -> Optional[Set[str]]:
+        """Returns the names changed since the last call.
+
+        Waits up to timeout seconds for the first event. Returns None when
+        events were lost and the directory must be re-scanned.
+        """
+        names: Set[str] = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        while ready:
+            try:
+                buffer = os.read(self._fd, _IN_BUFFER_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                _, mask, _, length = _IN_EVENT.unpack_from(buffer, offset)
+                offset += _IN_EVENT.size
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                name = buffer[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    names.add(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        """Stops watching."""
+        os.close(self._fd)
+
+
+class Watcher:
+    """Reports the changes to a directory between refreshes."""
+
+    def __init__(
+        self,
+        path: str,
+        *filters: Filter,
+        orderings: Sequence[Ordering] = (BY_NAME,),
+        use_inotify: bool = True,
+    ) -> None:
+        """Inits Watcher with a path and takes the first snapshot.
+
+        Args:
+            path: The directory to watch.
+            filters: The filters an entry must pass to be listed.
+            orderings: The orderings kept up to date incrementally, as in
+            sort_entries(). Ties are broken by name.
+            use_inotify: Whether to use inotify where it is available.
+        """
+        self._path = path
+        self._filters = filters
+        self._orderings = tuple(orderings)
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(path)
+            except (OSError, AttributeError):
+                self._inotify = None
+        self._entries: Dict[str, Entry] = {}
+        self._order: List[Any] = []
+        self._rebuild()
+
+    def entries(self) -> List[Entry]:
+        """Returns the entries in sorted order."""
+        return [self._entries[key[-1]] for key in self._order]
+
+    def refresh(self, timeout: float = 0.0) -> Changes:
+        """Returns the changes since the last refresh.
+
+        Args:
+            timeout: The time to wait for a change, in seconds. Only used
+            with inotify; polling returns right away.
+        """
+        if self._inotify is not None:
+            names = self._inotify.changed_names(timeout)
+            if names is not None:
+                return self._apply_names(names)
+        return self._apply_scan()
+
+    def watch(self, interval: float = POLL_INTERVAL) -> Iterator[Changes]:
+        """Yields the changes to the directory, forever.
+
+        Args:
+            interval: The time between polls, or the time to wait for an
+            event with inotify.
+        """
+        while True:
+            if self._inotify is None:
+                time.sleep(interval)
+            changes = self.refresh(timeout=interval)
+            if changes:
+                yield changes
+
+    def close(self) -> None:
+        """Stops watching."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _sort_key(self, entry: Entry) -> Any:
+        """Returns the position of an entry in the sorted order."""
+        return (
+            *(
+                _Descending(ordering.key(entry))
+                if ordering.reverse
+                else ordering.key(entry)
+                for ordering in self._orderings
+            ),
+            entry.name,
+        )
+
+    def _rebuild(self) -> None:
+        """Takes a full snapshot and sorts it once."""
+        self._entries = {
+            entry.name: entry
+            for entry in scan(self._path, *self._filters, stat=True)
+        }
+        self._order = sorted(
+            self._sort_key(entry) for entry in self._entries.values()
+        )
+
+    def _insert(self, entry: Entry) -> None:
+        self._entries[entry.name] = entry
+        bisect.insort(self._order, self._sort_key(entry))
+
+    def _remove(self, entry: Entry) -> None:
+        del self._entries[entry.name]
+        key = self._sort_key(entry)
+        del self._order[bisect.bisect_left(self._order, key)]
+
+    def _update(self, entry: Entry, changes: Changes) -> None:
+        """Records an entry as seen now and the change it represents."""
+        previous = self._entries.get(entry.name)
+        if previous is None:
+            changes.added.append(entry)
+            self._insert(entry)
+        elif _fingerprint(previous) != _fingerprint(entry):
+            changes.changed.append(entry)
+            self._remove(previous)
+            self._insert(entry)
+
+    def _apply_names(self, names: Set[str]) -> Changes:
+        """Stats only the changed names and applies them to the snapshot.
+
+        A name that no longer passes the filters counts as removed.
+        """
+        changes = Changes(added=[], removed=[], changed=[])
+        for name in sorted(names):
+            try:
+                entry = stat_entry(self._path, name)
+                listed = matches(entry, *self._filters)
+            except FileNotFoundError:
+                listed = False
+            if listed:
+                self._update(entry, changes)
+                continue
+            previous = self._entries.get(name)
+            if previous is not None:
+                changes.removed.append(previous)
+                self._remove(previous)
+        return changes
+
+    def _apply_scan(self) -> Changes:
+        """Re-scans the directory and applies the differences.
+
+        Nothing is sorted unless something changed, and then only the
+        changed entries are moved.
+        """
+        changes = Changes(added=[], removed=[], changed=[])
+        seen = set()
+        for entry in scan(self._path, *self._filters, stat=True):
+            seen.add(entry.name)
+            self._update(entry, changes)
+        if len(seen) != len(self._entries):
+            for name in self._entries.keys() - seen:
+                previous = self._entries[name]
+                changes.removed.append(previous)
+                self._remove(previous)
+        return changes
+
+
+if __name__ == "__main__":
+    watcher = Watcher("../")
+    for entry in watcher.entries():
+        print(entry.name)
+    for changes in watcher.watch():
+        for entry in changes.added:
+            print(f"+ {entry.name}")
+        for entry in changes.removed:
+            print(f"- {entry.name}")
+        for entry in changes.changed:
+            print(f"~ {entry.name}")